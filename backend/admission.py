@@ -0,0 +1,184 @@
+import functools
+import math
+import os
+import threading
+import time
+
+from flask import jsonify
+
+import metrics
+
+
+class Lane:
+    """
+    Concurrency budget for one kind of work.
+
+    At most `max_concurrent` requests run at once and at most `max_queue`
+    more wait for a slot, each for up to `queue_timeout` seconds. Anything
+    beyond that is turned away immediately.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout, retry_after):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+        self.retry_after = int(retry_after)
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self, bounded=True):
+        """
+        Takes a slot, waiting in the queue if needed. Returns False when
+        the queue is full or the wait times out. Unbounded callers
+        (background jobs) skip the queue limit and wait as long as it
+        takes.
+        """
+        with self._cond:
+            if self.active < self.max_concurrent and not self.waiting:
+                return self._admit()
+
+            if bounded and self.waiting >= self.max_queue:
+                self.rejected += 1
+                metrics.inc("lane_rejected_total", lane=self.name, reason="queue_full")
+                return False
+
+            self.waiting += 1
+            self._publish()
+            deadline = time.monotonic() + self.queue_timeout
+
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic() if bounded else None
+                    if remaining is not None and remaining <= 0:
+                        self.timed_out += 1
+                        metrics.inc("lane_rejected_total", lane=self.name, reason="timeout")
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+                self._publish()
+
+            return self._admit()
+
+    def _admit(self):
+        self.active += 1
+        self.admitted += 1
+        self._publish()
+        return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._publish()
+            self._cond.notify()
+
+    def _publish(self):
+        metrics.set_gauge("lane_active", self.active, lane=self.name)
+        metrics.set_gauge("lane_queue_depth", self.waiting, lane=self.name)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+
+# Same setting as app.CLIP_MAX_BATCH. Image requests only batch with each
+# other if that many can be in flight at once.
+CLIP_MAX_BATCH = int(os.environ.get("CLIP_MAX_BATCH", 16))
+
+# Server processes sharing the machine (serve.py sets it to --workers).
+# The defaults below are whole-server budgets and are split between them,
+# so with N workers each lane admits about its default in total, but at
+# least N, since every worker keeps one slot. LANE_* overrides are taken
+# as per-worker values.
+LANE_WORKERS = max(1, int(os.environ.get("LANE_WORKERS", 1)))
+
+# name: (max_concurrent, max_queue, queue_timeout_s, retry_after_s)
+LANE_DEFAULTS = {
+    "link": (16, 64, 10, 1),
+    "chat": (8, 32, 5, 1),
+    "image": (CLIP_MAX_BATCH, 4 * CLIP_MAX_BATCH, 10, 2),
+    "audio": (2, 8, 30, 10),
+    "video": (1, 4, 60, 30),
+    "image_batch": (1, 2, 5, 30),
+    "link_batch": (2, 8, 10, 5),
+}
+
+
+def _lane_from_env(name, defaults):
+    # e.g. LANE_VIDEO_CONCURRENCY=2, LANE_VIDEO_QUEUE=8, LANE_VIDEO_TIMEOUT=120
+    prefix = f"LANE_{name.upper()}_"
+    concurrent, queue, timeout, retry_after = defaults
+    concurrent = max(1, math.ceil(concurrent / LANE_WORKERS))
+    queue = math.ceil(queue / LANE_WORKERS)
+
+    return Lane(
+        name,
+        max_concurrent=int(os.environ.get(prefix + "CONCURRENCY", concurrent)),
+        max_queue=int(os.environ.get(prefix + "QUEUE", queue)),
+        queue_timeout=float(os.environ.get(prefix + "TIMEOUT", timeout)),
+        retry_after=int(os.environ.get(prefix + "RETRY_AFTER", retry_after)),
+    )
+
+
+lanes = {name: _lane_from_env(name, defaults) for name, defaults in LANE_DEFAULTS.items()}
+
+
+def admit(lane_name):
+    """
+    Runs the view inside `lane_name`, or answers 429 with Retry-After when
+    the lane is full. Streamed responses keep their slot until the body
+    has been sent.
+    """
+    lane = lanes[lane_name]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not lane.acquire():
+                response = jsonify({"error": f"The {lane_name} lane is busy, try again later"})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(lane.retry_after)
+                return response
+
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                lane.release()
+                raise
+
+            if getattr(response, "is_streamed", False):
+                response.call_on_close(lane.release)
+            else:
+                lane.release()
+            return response
+
+        return wrapper
+    return decorator
+
+
+def run_in_lane(lane_name, fn, *args):
+    """Runs `fn(*args)` in a lane without the queue limit (background jobs)."""
+    lane = lanes[lane_name]
+    lane.acquire(bounded=False)
+    try:
+        return fn(*args)
+    finally:
+        lane.release()
+
+
+def stats():
+    return {name: lane.stats() for name, lane in lanes.items()}
@@ -1,18 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for, Response, stream_with_context, g
 from flask_cors import CORS
 import numpy as np
 from PIL import Image
-import torch
 import os
+import io
+import json
+import functools
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from audio_whisper import analyze_audio_whisper
-from link_forensics import analyze_link_forensics
-
-
-from transformers import CLIPProcessor, CLIPModel
-from facenet_pytorch import MTCNN
-
-from video_forensics import analyze_video_forensics
-from video_timesformer import timesformer_ai_score
+from link_forensics import analyze_link_forensics, normalize_url, scan_links, fetch_cache
+from batching import MicroBatcher
+from result_cache import ResultCache, content_key
+from jobs import JobStore
+from uploads import upload_tempfile
+from image_io import decode_image, FFT_MAX_SIDE
+from model_registry import get_model, get_device, register_model, is_loaded, MTCNN_MIN_FACE_SIZE
+import model_registry
+import metrics
+import admission
+from admission import admit, run_in_lane
+
+from video_forensics import LandmarkForensicsStage
+from video_utils import FaceEmbeddingStage
+from video_timesformer import TimesformerStage
+from video_pipeline import run_video_pipeline
 from chatbot_logic import get_chatbot_response
 
 
@@ -40,94 +54,331 @@ app = Flask(__name__)
 CORS(app)
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
 
-clip_model = CLIPModel.from_pretrained(
-    "openai/clip-vit-base-patch32"
-).to(device)
-clip_model.eval()
+@app.after_request
+def record_request(response):
+    started = g.request_started
+    seconds = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
 
-clip_processor = CLIPProcessor.from_pretrained(
-    "openai/clip-vit-base-patch32"
+    if response.is_streamed:
+        # A streamed body is produced after this hook returns; time the
+        # request once the server has sent all of it.
+        response.call_on_close(
+            lambda: metrics.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint)
+        )
+    else:
+        metrics.observe("request_seconds", seconds, endpoint=endpoint)
+    metrics.inc("requests_total", endpoint=endpoint, status=response.status_code)
+    timings = metrics.finish_request()
+
+    # ?timings=1 adds the per-stage breakdown (ms) to JSON responses.
+    if request.args.get("timings") in ("1", "true") and response.is_json and not response.is_streamed:
+        body = response.get_json()
+        if isinstance(body, dict):
+            body["timings"] = dict(timings, total=round(seconds * 1000, 2))
+            response.set_data(json.dumps(body))
+
+    return response
+
+
+# Bump an entry whenever its models or thresholds change so that stale
+# cached verdicts are not served. Links are not cached here: their page
+# fetches expire in link_forensics.fetch_cache, and a link's verdict can
+# change as soon as its page does.
+ANALYZER_VERSIONS = {
+    "image": "clip-vit-b32+fft-4",
+    "video": "facemesh-4",
+    "audio": "whisper-base+vad-3",
+}
+
+result_cache = ResultCache(
+    max_items=int(os.environ.get("RESULT_CACHE_ITEMS", 1024)),
+    disk_dir=os.environ.get("RESULT_CACHE_DIR") or None,
+    disk_max_bytes=int(float(os.environ.get("RESULT_CACHE_DISK_MB", 512)) * 1024 * 1024),
+    rescan_seconds=float(os.environ.get("RESULT_CACHE_RESCAN_SECONDS", 30))
 )
 
-mtcnn = MTCNN(
-    keep_all=True,
-    device=device,
-    min_face_size=40
-)
 
+def cache_key(kind, payload, **options):
+    # Options that change the result (cascade, extra signals) get their
+    # own entries.
+    version = "+".join([ANALYZER_VERSIONS[kind]] + sorted(name for name, on in options.items() if on))
+    return content_key(kind, version, payload)
 
 
-def fft_frequency_score(image_pil):
-    gray = image_pil.convert("L")
-    img = np.array(gray, dtype=np.float32)
+# Cascade mode runs the cheap signals first and only pays for the
+# expensive ones when they could still change the verdict. Off unless
+# CASCADE_MODE=1; ?cascade=1 or ?cascade=0 overrides it per request.
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "0") in ("1", "true")
+
+
+# The face-embedding appearance signal does not feed the video verdict
+# and costs an MTCNN + EfficientNet pass, so it only runs on request.
+VIDEO_SIGNALS = os.environ.get("VIDEO_SIGNALS", "0") in ("1", "true")
+
+
+def query_flag(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value in ("1", "true")
+
+
+def cascade_requested():
+    return query_flag("cascade", CASCADE_MODE)
 
-    fft = np.fft.fft2(img)
-    fft_shift = np.fft.fftshift(fft)
-    magnitude = np.log(np.abs(fft_shift) + 1.0)
 
-    h, w = magnitude.shape
-    magnitude[h//2-10:h//2+10, w//2-10:w//2+10] = 0
 
-    energy = np.mean(magnitude)
-    max_energy = np.max(magnitude) + 1e-8
+# Face crops are resized to this square before their spectra are taken.
+# Images without faces are scored with their longer side capped at
+# FFT_MAX_SIDE.
+FFT_FACE_SIZE = int(os.environ.get("FFT_FACE_SIZE", 256))
 
-    score = energy / max_energy
-    return float(np.clip(score, 0.0, 1.0))
+# Half-width of the low-frequency block removed around the spectrum centre.
+FFT_CENTER = 10
 
 
-def face_only_fft_score(image_pil):
-    boxes, _ = mtcnn.detect(image_pil)
+@functools.lru_cache(maxsize=16)
+def fft_center_weights(h, w):
+    """
+    Weights over an rfft2 spectrum of an h x w image: how many bins of the
+    full, fftshift-ed spectrum each one stands for (0, 1 or 2) once the
+    centre block is zeroed. Weighted sums over the half spectrum then
+    equal sums over the full one.
+    """
+    keep = np.ones((h, w), dtype=np.float32)
+    keep[h//2-FFT_CENTER:h//2+FFT_CENTER, w//2-FFT_CENTER:w//2+FFT_CENTER] = 0
+    keep = np.fft.ifftshift(keep)
 
-    if boxes is None or len(boxes) == 0:
-        return fft_frequency_score(image_pil)
+    half = w // 2 + 1
+    weights = keep[:, :half].copy()
+
+    # Columns other than 0 and w/2 also stand for their mirror (-row, -col).
+    paired = np.ones(half, dtype=bool)
+    paired[0] = False
+    if w % 2 == 0:
+        paired[w // 2] = False
+
+    mirror = keep[(-np.arange(h)) % h][:, (-np.arange(half)) % w]
+    weights[:, paired] += mirror[:, paired]
+
+    weights.flags.writeable = False
+    return weights
+
+
+def fft_frequency_scores(grays):
+    """Scores a stack of same-sized grayscale images, shape (N, H, W)."""
+    _, h, w = grays.shape
+    weights = fft_center_weights(h, w)
+
+    magnitude = np.log1p(np.abs(np.fft.rfft2(grays)))
+
+    energy = (magnitude * weights).sum(axis=(1, 2)) / (h * w)
+    max_energy = np.where(weights > 0, magnitude, 0).max(axis=(1, 2)) + 1e-8
+
+    return np.clip(energy / max_energy, 0.0, 1.0)
+
+
+def fft_frequency_score(image_pil):
+    if max(image_pil.size) > FFT_MAX_SIDE:
+        scale = FFT_MAX_SIDE / max(image_pil.size)
+        size = (max(1, round(image_pil.width * scale)), max(1, round(image_pil.height * scale)))
+        image_pil = image_pil.resize(size, Image.BICUBIC, reducing_gap=2.0)
 
-    scores = []
+    img = np.asarray(image_pil.convert("L"), dtype=np.float32)
+    return float(fft_frequency_scores(img[None])[0])
 
-    for box in boxes:
-        x1, y1, x2, y2 = map(int, box)
+
+def face_crops(views, boxes):
+    image = views.base
+    crops = []
+
+    for box in boxes if boxes is not None else []:
+        x1, y1, x2, y2 = (int(v * views.detect_scale) for v in box)
         x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(image_pil.width, x2), min(image_pil.height, y2)
+        x2, y2 = min(image.width, x2), min(image.height, y2)
 
-        face = image_pil.crop((x1, y1, x2, y2))
-        if face.width < 40 or face.height < 40:
+        if x2 - x1 < 40 or y2 - y1 < 40:
             continue
 
-        scores.append(fft_frequency_score(face))
+        face = image.crop((x1, y1, x2, y2)).convert("L")
+        face = face.resize((FFT_FACE_SIZE, FFT_FACE_SIZE), Image.BICUBIC)
+        crops.append(np.asarray(face, dtype=np.float32))
 
-    if not scores:
-        return fft_frequency_score(image_pil)
+    return crops
 
-    return float(np.mean(scores))
 
+def can_hold_face(views):
+    return min(views.detect.size) >= MTCNN_MIN_FACE_SIZE
 
 
-def clip_ai_score(image_pil):
-    prompts = [
-        "a real photograph taken with a camera",
-        "a natural unedited photo",
-        "an AI-generated image",
-        "a synthetic digital artwork"
-    ]
+def face_only_fft_score(views):
+    boxes = None
+    if can_hold_face(views):
+        with metrics.timed("mtcnn"):
+            boxes, _ = get_model("mtcnn").detect(views.detect)
+    metrics.inc("faces_found_total", 0 if boxes is None else len(boxes), source="image")
+
+    with metrics.timed("face_fft"):
+        crops = face_crops(views, boxes)
+
+        if not crops:
+            return fft_frequency_score(views.fft)
+
+        return float(np.mean(fft_frequency_scores(np.stack(crops))))
+
+
+def face_only_fft_scores(views_list):
+    """
+    face_only_fft_score for many images: MTCNN runs once per group of
+    same-sized detector views, and every face crop goes through one FFT.
+    Images the detector fails on score None.
+    """
+    mtcnn = get_model("mtcnn")
+
+    groups = {}
+    for i, views in enumerate(views_list):
+        if can_hold_face(views):
+            groups.setdefault(views.detect.size, []).append(i)
+
+    boxes = [None] * len(views_list)
+    failed = set()
+    with metrics.timed("mtcnn"):
+        for indices in groups.values():
+            for i, b in detect_group(mtcnn, views_list, indices):
+                if b is False:
+                    failed.add(i)
+                else:
+                    boxes[i] = b
+    metrics.inc("faces_found_total", sum(len(b) for b in boxes if b is not None), source="image")
+
+    with metrics.timed("face_fft"):
+        crops = [face_crops(views, b) for views, b in zip(views_list, boxes)]
+        stacked = [c for image_crops in crops for c in image_crops]
+        face_scores = iter(fft_frequency_scores(np.stack(stacked)) if stacked else [])
+
+        scores = []
+        for i, (views, image_crops) in enumerate(zip(views_list, crops)):
+            if i in failed:
+                scores.append(None)
+            elif image_crops:
+                scores.append(float(np.mean([next(face_scores) for _ in image_crops])))
+            else:
+                scores.append(fft_frequency_score(views.fft))
+
+    return scores
+
+
+def detect_group(mtcnn, views_list, indices):
+    """
+    Yields (index, boxes) for one group of same-sized views, or
+    (index, False) for an image the detector raised on. A failed group
+    is retried image by image so one bad image does not sink the rest.
+    """
+    try:
+        found, _ = mtcnn.detect([views_list[i].detect for i in indices])
+    except Exception:
+        if len(indices) == 1:
+            yield indices[0], False
+            return
+        for i in indices:
+            yield from detect_group(mtcnn, views_list, [i])
+        return
+
+    yield from zip(indices, found)
+
+
+
+CLIP_PROMPTS = [
+    "a real photograph taken with a camera",
+    "a natural unedited photo",
+    "an AI-generated image",
+    "a synthetic digital artwork"
+]
+
+CLIP_MAX_BATCH = int(os.environ.get("CLIP_MAX_BATCH", 16))
+CLIP_MAX_WAIT_MS = float(os.environ.get("CLIP_MAX_WAIT_MS", 10))
+
+
+def clip_features(output):
+    import torch
+
+    # transformers 5 wraps the projected features in a model output.
+    return output if torch.is_tensor(output) else output.pooler_output
+
+
+def clip_text_embeddings(prompts):
+    import torch
+
+    clip_model, clip_processor = get_model("clip")
 
     inputs = clip_processor(
         text=prompts,
-        images=image_pil,
         return_tensors="pt",
         padding=True
-    ).to(device)
+    ).to(get_device())
+
+    with torch.no_grad():
+        text_embeds = clip_features(clip_model.get_text_features(**inputs))
+
+    return text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+
+
+# The prompts never change, so they are encoded once alongside the model
+# and only the image encoder runs per request.
+register_model("clip_text_embeds", lambda: clip_text_embeddings(CLIP_PROMPTS))
+
+
+def clip_ai_scores(images):
+    import torch
+
+    clip_model, clip_processor = get_model("clip")
+    clip_text_embeds = get_model("clip_text_embeds")
+
+    inputs = clip_processor(
+        images=images,
+        return_tensors="pt"
+    ).to(get_device())
 
     with torch.no_grad():
-        logits = clip_model(**inputs).logits_per_image[0]
-        probs = logits.softmax(dim=0)
+        image_embeds = clip_features(clip_model.get_image_features(**inputs))
+        image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+
+        logits = clip_model.logit_scale.exp() * image_embeds @ clip_text_embeds.t()
+        probs = logits.softmax(dim=1)
+
+    real_prob = probs[:, 0] + probs[:, 1]
+    ai_prob = probs[:, 2] + probs[:, 3]
+
+    return (ai_prob / (ai_prob + real_prob + 1e-8)).tolist()
+
+
+clip_batcher = MicroBatcher(
+    clip_ai_scores,
+    max_batch_size=CLIP_MAX_BATCH,
+    max_wait_ms=CLIP_MAX_WAIT_MS
+)
+
+
+def clip_ai_score(image_pil):
+    # Includes the wait for the micro-batch to fill.
+    with metrics.timed("clip"):
+        return clip_batcher.submit(image_pil)
 
-    real_prob = float(probs[0] + probs[1])
-    ai_prob = float(probs[2] + probs[3])
 
-    return ai_prob / (ai_prob + real_prob + 1e-8)
 
+# FFT scores between these two are "Possibly AI-Generated" whatever CLIP
+# says, so cascade mode only runs CLIP outside that band. Skipped CLIP
+# scores count as CLIP_PRIOR.
+IMAGE_FFT_REAL = 0.40
+IMAGE_FFT_AI = 0.72
+CLIP_PRIOR = 0.5
 
 
 def image_decision(fft_score, clip_score):
@@ -136,15 +387,19 @@ def image_decision(fft_score, clip_score):
 
     combined = 0.65 * fft_score + 0.35 * clip_score
 
-    if fft_score > 0.72 and clip_score > 0.75:
+    if fft_score > IMAGE_FFT_AI and clip_score > 0.75:
         return "AI-Generated", int(combined * 100)
 
-    if fft_score < 0.40 and clip_score < 0.45:
+    if fft_score < IMAGE_FFT_REAL and clip_score < 0.45:
         return "Real", int((1 - combined) * 100)
 
     return "Possibly AI-Generated", int(abs(combined - 0.5) * 200)
 
 
+def needs_clip(fft_score, cascade):
+    return not cascade or not (IMAGE_FFT_REAL <= fft_score <= IMAGE_FFT_AI)
+
+
 
 def video_decision(forensic, temporal):
     forensic = float(np.clip(forensic, 0, 1))
@@ -163,6 +418,7 @@ def video_decision(forensic, temporal):
     # ONLY HERE → POSSIBLE AI
     return "Possibly AI-Generated", int(combined * 100)
 
+
 def image_reasons(fft_score, clip_score):
     reasons = []
 
@@ -180,7 +436,9 @@ def image_reasons(fft_score, clip_score):
             "description": "The image exhibits natural frequency characteristics typical of real photographs."
         })
 
-    
+    if clip_score is None:
+        return reasons
+
     if clip_score > 0.6:
         reasons.append({
             "title": "Semantic Inconsistency",
@@ -199,39 +457,221 @@ def image_reasons(fft_score, clip_score):
 
 
 @app.route("/analyze/image", methods=["POST"])
+@admit("image")
 def analyze_image():
     if "file" not in request.files:
         return jsonify({"verdict": "Possibly AI-Generated", "confidence": 50})
 
-    image = Image.open(request.files["file"].stream).convert("RGB")
+    cascade = cascade_requested()
 
-    fft_score = face_only_fft_score(image)
-    clip_score = clip_ai_score(image)
+    with metrics.timed("upload_read"):
+        data = request.files["file"].read()
+    key = cache_key("image", data, cascade=cascade)
 
-    verdict, confidence = image_decision(fft_score, clip_score)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return jsonify(cached)
 
-    return jsonify({
+    with metrics.timed("image_decode"):
+        views = decode_image(data)
+
+    fft_score = face_only_fft_score(views)
+    clip_score = clip_ai_score(views.clip) if needs_clip(fft_score, cascade) else None
+
+    result = image_result(fft_score, clip_score)
+    result_cache.put(key, result)
+
+    return jsonify(result)
+
+
+def image_result(fft_score, clip_score):
+    # clip_score is None when cascade mode skipped CLIP.
+    verdict, confidence = image_decision(fft_score, CLIP_PRIOR if clip_score is None else clip_score)
+
+    return {
         "verdict": verdict,
         "confidence": confidence,
-        "reasons": image_reasons(fft_score, clip_score)
+        "reasons": image_reasons(fft_score, clip_score),
+        "stages": ["face_fft"] if clip_score is None else ["face_fft", "clip"]
+    }
+
+
+IMAGE_BATCH_SIZE = int(os.environ.get("IMAGE_BATCH_SIZE", CLIP_MAX_BATCH))
+IMAGE_BATCH_MAX_FILES = int(os.environ.get("IMAGE_BATCH_MAX_FILES", 1000))
+IMAGE_BATCH_MAX_FILE_MB = float(os.environ.get("IMAGE_BATCH_MAX_FILE_MB", 50))
+IMAGE_DECODE_WORKERS = int(os.environ.get("IMAGE_DECODE_WORKERS", 4))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+
+
+def image_uploads(files):
+    """
+    Yields (name, bytes) for each uploaded (name, bytes) pair, expanding
+    zip archives member by member. Oversized files, corrupt archives and
+    members that fail to extract yield (name, None).
+    """
+    max_bytes = int(IMAGE_BATCH_MAX_FILE_MB * 1024 * 1024)
+
+    for filename, data in files:
+        archive = io.BytesIO(data)
+        if not zipfile.is_zipfile(archive):
+            yield filename, data if len(data) <= max_bytes else None
+            continue
+
+        try:
+            archive = zipfile.ZipFile(archive)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, ValueError, EOFError, OSError):
+            yield filename, None
+            continue
+
+        with archive:
+            for info in archive.infolist():
+                name = info.filename
+                base = os.path.basename(name)
+
+                if info.is_dir() or base.startswith(".") or name.startswith("__MACOSX/"):
+                    continue
+                if not base.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+
+                if info.file_size > max_bytes:
+                    yield name, None
+                    continue
+
+                try:
+                    member = archive.read(info)
+                except (zipfile.BadZipFile, zlib.error, EOFError, OSError, NotImplementedError, RuntimeError):
+                    # Truncated data, a CRC mismatch, an unsupported
+                    # compression method or an encrypted member.
+                    member = None
+                yield name, member
+
+
+def decode_upload(data):
+    try:
+        with metrics.timed("image_decode"):
+            return decode_image(data)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        return None
+
+
+def score_image_batch(batch, cascade=False):
+    """
+    Scores one chunk of (index, name, key, cached, decode_future) and
+    yields (index, name, result) in order.
+    """
+    decoded = [(entry, entry[4].result() if entry[4] else None) for entry in batch]
+    views_list = [views for _, views in decoded if views is not None]
+
+    fft_scores = face_only_fft_scores(views_list) if views_list else []
+    clip_scores = [None] * len(views_list)
+
+    wanted = [i for i, score in enumerate(fft_scores) if score is not None and needs_clip(score, cascade)]
+    if wanted:
+        with metrics.timed("clip"):
+            for i, score in zip(wanted, clip_ai_scores([views_list[i].clip for i in wanted])):
+                clip_scores[i] = score
+
+    scores = iter(zip(fft_scores, clip_scores))
+
+    for (index, name, key, cached, future), views in decoded:
+        if cached is not None:
+            result = cached
+        elif views is None:
+            result = {"error": "Not a readable image or too large"}
+        else:
+            fft_score, clip_score = next(scores)
+            if fft_score is None:
+                result = {"error": "Image analysis failed"}
+            else:
+                result = image_result(fft_score, clip_score)
+                result_cache.put(key, result)
+
+        yield index, name, result
+
+
+def analyze_image_uploads(uploads, cascade=False):
+    """
+    Yields (index, name, result) for every upload. Each chunk of
+    IMAGE_BATCH_SIZE images is decoded on a thread pool while the
+    previous chunk is being scored.
+    """
+    with ThreadPoolExecutor(max_workers=IMAGE_DECODE_WORKERS, thread_name_prefix="decode") as pool:
+        previous = []
+        batch = []
+        overflow = None
+
+        for index, (name, data) in enumerate(uploads):
+            if index >= IMAGE_BATCH_MAX_FILES:
+                overflow = (index, name)
+                break
+
+            if data is None:
+                batch.append((index, name, None, None, None))
+            else:
+                key = cache_key("image", data, cascade=cascade)
+                cached = result_cache.get(key)
+                future = pool.submit(decode_upload, data) if cached is None else None
+                batch.append((index, name, key, cached, future))
+
+            if len(batch) >= IMAGE_BATCH_SIZE:
+                yield from score_image_batch(previous, cascade)
+                previous, batch = batch, []
+
+        yield from score_image_batch(previous, cascade)
+        yield from score_image_batch(batch, cascade)
+
+        if overflow is not None:
+            yield (*overflow, {"error": f"At most {IMAGE_BATCH_MAX_FILES} images per request; the rest were skipped"})
+
+
+@app.route("/analyze/images", methods=["POST"])
+@admit("image_batch")
+def analyze_images():
+    files = request.files.getlist("files") + request.files.getlist("file")
+
+    if not files:
+        return jsonify({"error": "Expected one or more files, or a zip archive"}), 400
+
+    stream = request.args.get("stream") in ("1", "true")
+
+    # Read now: uploaded files are closed before a streamed body is sent.
+    files = [(f.filename, f.read()) for f in files]
+    results = analyze_image_uploads(image_uploads(files), cascade_requested())
+
+    if stream:
+        def ndjson():
+            for index, name, result in results:
+                yield json.dumps({"index": index, "name": name, **result}) + "\n"
+
+        return Response(stream_with_context(ndjson()), mimetype="application/x-ndjson")
+
+    return jsonify({
+        "results": [{"name": name, **result} for _, name, result in results]
     })
 
 
 
 
-@app.route("/analyze/video", methods=["POST"])
-def analyze_video():
-    if "file" not in request.files:
-        return jsonify({"verdict": "Error", "confidence": 0})
+def video_result(data, cascade=False, signals=False):
+    key = cache_key("video", data, cascade=cascade, signals=signals)
+
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
 
-    file = request.files["file"]
-    path = "temp_video.mp4"
-    file.save(path)
+    with upload_tempfile(data, suffix=".mp4") as path:
+        # Landmark forensics decides the verdict. In cascade mode it stops
+        # reading frames once its statistics settle.
+        landmarks = LandmarkForensicsStage(converge=cascade)
+        stages = [landmarks]
+        if signals:
+            stages += [FaceEmbeddingStage(), TimesformerStage()]
 
-    verdict, confidence = analyze_video_forensics(path)
+        # One decode feeds every analyzer.
+        results = run_video_pipeline(path, stages)
 
-    if os.path.exists(path):
-        os.remove(path)
+    verdict, confidence = results[0]
 
     
     reasons = [
@@ -267,13 +707,59 @@ def analyze_video():
         },
     ]
 
-    return jsonify({
+    result = {
         "verdict": verdict,
         "confidence": confidence,
-        "reasons": reasons
-    })
+        "reasons": reasons,
+        "signals": {
+            "motion": dict(landmarks.stats, frames=landmarks.frames_seen, converged=landmarks.converged),
+            "appearance": {
+                "verdict": results[1][0],
+                "confidence": results[1][1]
+            } if signals else None,
+            # Raw fake probability from TimeSformer; reported only, it does
+            # not feed the verdict.
+            "timesformer": {"score": results[2]} if signals else None
+        },
+        "stages": [stage.name for stage in stages]
+    }
+    result_cache.put(key, result)
+
+    return result
+
+
+def audio_result(data):
+    key = cache_key("audio", data)
+
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    verdict, confidence, reasons, info = analyze_audio_whisper(data)
+
+    result = {
+        "verdict": verdict,
+        "confidence": confidence,
+        "reasons": reasons,
+        "audio": info
+    }
+    result_cache.put(key, result)
+
+    return result
+
+
+@app.route("/analyze/video", methods=["POST"])
+@admit("video")
+def analyze_video():
+    if "file" not in request.files:
+        return jsonify({"verdict": "Error", "confidence": 0})
+
+    data = request.files["file"].read()
+    return jsonify(video_result(data, cascade_requested(), query_flag("signals", VIDEO_SIGNALS)))
+
 
 @app.route("/analyze/audio", methods=["POST"])
+@admit("audio")
 def analyze_audio():
     if "file" not in request.files:
         return jsonify({
@@ -281,27 +767,69 @@ def analyze_audio():
             "confidence": 0
         })
 
-    file = request.files["file"]
-    path = "temp_audio.wav"
+    return jsonify(audio_result(request.files["file"].read()))
 
-   
-    file.save(path)
 
-    try:
-        verdict, confidence, reasons = analyze_audio_whisper(path)
+# Long media can be analysed in the background: submit returns a job id
+# straight away and the result is polled from /jobs/<job_id>. Jobs share
+# their modality's lane with direct requests, so they queue behind them
+# rather than adding to the load.
+JOB_RUNNERS = {
+    "video": functools.partial(run_in_lane, "video", video_result),
+    "audio": functools.partial(run_in_lane, "audio", audio_result),
+}
 
-        return jsonify({
-            "verdict": verdict,
-            "confidence": confidence,
-            "reasons": reasons
-        })
+job_store = JobStore(
+    max_workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_pending=int(os.environ.get("JOB_MAX_PENDING", 16)),
+    ttl_seconds=float(os.environ.get("JOB_TTL_SECONDS", 3600)),
+    jobs_dir=os.environ.get("JOBS_DIR") or None
+)
+
+
+@app.route("/jobs/<kind>", methods=["POST"])
+def submit_job(kind):
+    if kind not in JOB_RUNNERS:
+        return jsonify({"error": f"Unknown job type: {kind}"}), 404
+
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    args = [request.files["file"].read()]
+    if kind == "video":
+        args += [cascade_requested(), query_flag("signals", VIDEO_SIGNALS)]
+
+    job = job_store.submit(kind, JOB_RUNNERS[kind], *args)
+
+    if job is None:
+        response = jsonify({"error": "Job queue is full, try again later"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": url_for("job_status", job_id=job["id"])
+    }), 202
+
+
+@app.route("/jobs", methods=["GET"])
+def job_stats():
+    return jsonify(job_store.stats())
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_store.get(job_id)
+
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    return jsonify(job)
 
-    finally:
-        
-        if os.path.exists(path):
-            os.remove(path)
 
 @app.route("/analyze/link", methods=["POST"])
+@admit("link")
 def analyze_link():
     data = request.get_json()
 
@@ -311,16 +839,64 @@ def analyze_link():
             "confidence": 0
         })
 
-    verdict, confidence, reasons = analyze_link_forensics(data["url"])
+    return jsonify(link_result(*analyze_link_forensics(data["url"])))
 
-    return jsonify({
+
+def link_result(verdict, confidence, reasons, page):
+    return {
         "verdict": verdict,
         "confidence": confidence,
-        "reasons": reasons
-    })
+        "reasons": reasons,
+        "fetch": page
+    }
+
+
+LINK_BATCH_MAX_URLS = int(os.environ.get("LINK_BATCH_MAX_URLS", 1000))
+
+
+@app.route("/analyze/links", methods=["POST"])
+@admit("link_batch")
+def analyze_links():
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
+
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        return jsonify({"error": "Expected a JSON body with a list of urls"}), 400
+
+    if len(urls) > LINK_BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {LINK_BATCH_MAX_URLS} urls per request"}), 413
+
+    stream = request.args.get("stream") in ("1", "true") or data.get("stream") is True
+
+    # Each distinct link is analysed once however often it appears in
+    # the list.
+    indices = {}
+    for i, url in enumerate(urls):
+        indices.setdefault(normalize_url(url), []).append(i)
+
+    def results():
+        distinct = list(indices)
+        for j, found in scan_links(distinct):
+            result = link_result(*found)
+            for i in indices[distinct[j]]:
+                yield i, result
+
+    if stream:
+        def ndjson():
+            for i, result in results():
+                yield json.dumps({"index": i, "url": urls[i], **result}) + "\n"
+
+        return Response(stream_with_context(ndjson()), mimetype="application/x-ndjson")
+
+    ordered = [None] * len(urls)
+    for i, result in results():
+        ordered[i] = {"url": urls[i], **result}
+
+    return jsonify({"results": ordered})
 
 
 @app.route("/analyze/chat", methods=["POST"])
+@admit("chat")
 def chat_bot():
     data = request.get_json()
     if not data or "message" not in data:
@@ -332,6 +908,56 @@ def chat_bot():
     return jsonify({"response": response})
 
 
+# Models that must be loaded before /ready reports the worker as ready.
+READY_MODELS = [
+    name.strip()
+    for name in os.environ.get("READY_MODELS", "").split(",")
+    if name.strip()
+]
+
+
+@app.route("/warmup", methods=["POST"])
+def warmup():
+    data = request.get_json(silent=True) or {}
+    names = data.get("models") or READY_MODELS or None
+
+    unknown = [n for n in names or [] if n not in model_registry.registered_models()]
+    if unknown:
+        return jsonify({"error": f"Unknown models: {', '.join(unknown)}"}), 400
+
+    models = model_registry.warmup(names)
+    failed = any(m["error"] for m in models.values())
+
+    return jsonify({"models": models}), 500 if failed else 200
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    is_ready = all(is_loaded(name) for name in READY_MODELS)
+
+    return jsonify({
+        "ready": is_ready,
+        "models": model_registry.status()
+    }), 200 if is_ready else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    stats = result_cache.stats()
+    stats["link_fetch"] = fetch_cache.stats()
+    return jsonify(stats)
+
+
+@app.route("/lanes", methods=["GET"])
+def lane_stats():
+    return jsonify(admission.stats())
+
+
 
 
 
@@ -0,0 +1,106 @@
+import io
+
+import numpy as np
+
+from uploads import upload_tempfile
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+TARGET_SR = 16000
+
+# Decode this many seconds at a time so multi-minute uploads never hold
+# the full-rate, multi-channel signal in memory.
+BLOCK_SECONDS = 10
+
+
+class _Resampler:
+    """Streams blocks through soxr, or passes them through at 16 kHz."""
+
+    def __init__(self, source_sr, target_sr):
+        self.stream = None
+        if source_sr != target_sr:
+            import soxr
+            self.stream = soxr.ResampleStream(source_sr, target_sr, 1, dtype="float32", quality="HQ")
+
+    def __call__(self, block, last=False):
+        if self.stream is None:
+            return block
+        return self.stream.resample_chunk(block, last=last)
+
+
+def _as_file(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _decode_soundfile(source, target_sr):
+    import soundfile as sf
+
+    out = []
+    with sf.SoundFile(_as_file(source)) as f:
+        resample = _Resampler(f.samplerate, target_sr)
+        for block in f.blocks(blocksize=int(f.samplerate * BLOCK_SECONDS), dtype="float32", always_2d=True):
+            out.append(resample(block.mean(axis=1)))
+        out.append(resample(np.zeros(0, dtype=np.float32), last=True))
+
+    return out
+
+
+def _decode_av(source, target_sr):
+    out = []
+    with av.open(_as_file(source)) as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=target_sr)
+
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                out.append(resampled.to_ndarray().reshape(-1))
+
+        for resampled in resampler.resample(None):
+            out.append(resampled.to_ndarray().reshape(-1))
+
+    return out
+
+
+def _decode_librosa(source, target_sr):
+    import librosa
+
+    if not isinstance(source, (bytes, bytearray)):
+        return [librosa.load(source, sr=target_sr, res_type="soxr_hq")[0]]
+
+    with upload_tempfile(source) as path:
+        return [librosa.load(path, sr=target_sr, res_type="soxr_hq")[0]]
+
+
+def decode_audio(source, target_sr=TARGET_SR):
+    """
+    Decodes a path or uploaded bytes to mono float32 at `target_sr`.
+
+    soundfile formats (WAV, FLAC, OGG, MP3) are decoded from memory block
+    by block, downmixed per block, and resampled with soxr only when the
+    source rate differs. Other containers (M4A, AAC, ...) go through
+    PyAV in memory when it is installed, and through librosa on a private
+    temp file otherwise.
+    """
+    try:
+        blocks = _decode_soundfile(source, target_sr)
+    except RuntimeError:
+        blocks = None
+
+    if blocks is None and av is not None:
+        try:
+            blocks = _decode_av(source, target_sr)
+        except (av.error.FFmpegError, IndexError):
+            blocks = None
+
+    if blocks is None:
+        blocks = _decode_librosa(source, target_sr)
+
+    blocks = [b for b in blocks if len(b)]
+    if not blocks:
+        return np.zeros(0, dtype=np.float32)
+
+    return np.concatenate(blocks).astype(np.float32, copy=False)
@@ -1,35 +1,131 @@
-import torch
-import librosa
+import os
 import numpy as np
-from transformers import WhisperModel, WhisperProcessor
+from model_registry import get_model, get_device, register_model
+from audio_io import decode_audio
+from voice_activity import trim_silence
+import metrics
 
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
+SAMPLE_RATE = 16000
 
-processor = WhisperProcessor.from_pretrained("openai/whisper-base")
-model = WhisperModel.from_pretrained("openai/whisper-base").to(device)
-model.eval()
+# Whisper's encoder always takes 30 s of log-mel frames; each hidden state
+# covers two 10 ms mel hops.
+MAX_WINDOW_SECONDS = 30.0
+SAMPLES_PER_STATE = 320
 
+N_FFT = 400
+HOP_LENGTH = 160
+N_SAMPLES = int(MAX_WINDOW_SECONDS * SAMPLE_RATE)
 
+WINDOW_SECONDS = float(os.environ.get("WHISPER_WINDOW_SECONDS", 30))
+OVERLAP_SECONDS = float(os.environ.get("WHISPER_OVERLAP_SECONDS", 5))
+MAX_WINDOWS_PER_BATCH = int(os.environ.get("WHISPER_MAX_BATCH", 8))
 
-def whisper_ai_score(audio_path):
-    
-    y, sr = librosa.load(audio_path, sr=16000)
 
-    
-    inputs = processor(
-        y,
-        sampling_rate=16000,
-        return_tensors="pt"
-    )
+def load_audio(source):
+    """
+    Decodes a path or raw uploaded bytes to 16 kHz mono (see
+    audio_io.decode_audio). A waveform that is already decoded passes
+    through.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+
+    with metrics.timed("audio_decode"):
+        return decode_audio(source, SAMPLE_RATE)
+
+
+def _load_mel_basis():
+    import torch
+
+    _, processor = get_model("whisper")
+    extractor = getattr(processor, "feature_extractor", processor)
+    device = get_device()
+
+    mel_filters = torch.from_numpy(np.asarray(extractor.mel_filters, dtype=np.float32))
+    return mel_filters.T.contiguous().to(device), torch.hann_window(N_FFT).to(device)
+
+
+# The filterbank and window never change; build them once per process.
+register_model("whisper_mel", _load_mel_basis)
+
+
+def log_mel_features(windows):
+    """
+    Whisper's log-mel input for a batch of windows, each padded to 30 s,
+    computed with torch.stft and the cached filterbank. Matches
+    WhisperFeatureExtractor without its per-call numpy STFT.
+    """
+    import torch
+
+    mel_basis, hann = get_model("whisper_mel")
+    device = hann.device
+
+    batch = torch.zeros(len(windows), N_SAMPLES, device=device)
+    for i, w in enumerate(windows):
+        w = torch.from_numpy(np.ascontiguousarray(w[:N_SAMPLES], dtype=np.float32))
+        batch[i, :len(w)] = w
+
+    stft = torch.stft(batch, N_FFT, HOP_LENGTH, window=hann, return_complex=True)
+    magnitudes = stft[..., :-1].abs() ** 2
+
+    log_spec = torch.clamp(mel_basis @ magnitudes, min=1e-10).log10()
+    max_val = log_spec.amax(dim=(1, 2), keepdim=True)
+    log_spec = torch.maximum(log_spec, max_val - 8.0)
+
+    return (log_spec + 4.0) / 4.0
+
+
+
+def split_windows(y, window_seconds=WINDOW_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+    """
+    Cuts the waveform into overlapping windows no longer than Whisper's
+    30 s input. The last window is aligned to the end of the clip.
+    """
+    window = int(min(window_seconds, MAX_WINDOW_SECONDS) * SAMPLE_RATE)
+    hop = max(1, window - int(overlap_seconds * SAMPLE_RATE))
+
+    if len(y) <= window:
+        return [y]
 
-    input_features = inputs.input_features.to(device)
+    starts = list(range(0, len(y) - window, hop))
+    if starts[-1] != len(y) - window:
+        starts.append(len(y) - window)
 
-    with torch.no_grad():
-        enc = model.encoder(input_features)
-        h = enc.last_hidden_state.squeeze(0)  # [T, D]
+    return [y[s:s + window] for s in starts]
+
+
+def encode_windows(windows):
+    """
+    Runs the Whisper encoder over all windows in as few batched calls as
+    possible and returns, per window, only the hidden states that cover
+    real audio rather than padding.
+    """
+    import torch
+
+    model, _ = get_model("whisper")
+
+    hidden = []
+
+    for i in range(0, len(windows), MAX_WINDOWS_PER_BATCH):
+        chunk = windows[i:i + MAX_WINDOWS_PER_BATCH]
+
+        with torch.no_grad():
+            with metrics.timed("whisper_features"):
+                input_features = log_mel_features(chunk)
+            with metrics.timed("whisper_encoder"):
+                enc = model.encoder(input_features)
+
+        for w, h in zip(chunk, enc.last_hidden_state):
+            valid = max(1, -(-len(w) // SAMPLES_PER_STATE))
+            hidden.append(h[:valid])  # [T, D]
+
+    return hidden
+
+
+def regularity_ratio(h):
+    import torch
 
-   
     delta = torch.norm(h[1:] - h[:-1], dim=1)
 
     
@@ -37,17 +133,54 @@ def whisper_ai_score(audio_path):
     std_delta = delta.std().item()
 
     
-    regularity_ratio = std_delta / (mean_delta + 1e-6)
+    return std_delta / (mean_delta + 1e-6)
+
+
+
+def whisper_analysis(audio):
+    """
+    Returns the AI score together with a summary of the audio that was
+    analysed (duration, speech kept by the VAD, number of windows).
+    """
+    y = load_audio(audio)
+
+    # Silence and background noise only add encoder work and flatten the
+    # frame-to-frame deltas, so drop them first.
+    with metrics.timed("vad"):
+        speech, info = trim_silence(y, SAMPLE_RATE)
+
+    windows = split_windows(speech)
+    hidden = encode_windows(windows)
+    info["windows"] = len(windows)
+
+    # Combine per-window regularity, weighted by how much audio each covers.
+    ratios = []
+    weights = []
+    for h in hidden:
+        if len(h) < 3:
+            continue
+        ratios.append(regularity_ratio(h))
+        weights.append(len(h))
+
+    if not ratios:
+        return 0.5, info
+
+    ratio = float(np.average(ratios, weights=weights))
+    info["regularity_ratio"] = round(ratio, 4)
 
     
-    ai_score = np.clip(0.85 - regularity_ratio, 0.0, 1.0)
+    ai_score = np.clip(0.85 - ratio, 0.0, 1.0)
+
+    return float(ai_score), info
+
 
-    return float(ai_score)
+def whisper_ai_score(audio):
+    return whisper_analysis(audio)[0]
 
 
 
-def analyze_audio_whisper(audio_path):
-    score = whisper_ai_score(audio_path)
+def analyze_audio_whisper(audio):
+    score, info = whisper_analysis(audio)
 
     if score > 0.55:
         verdict = "AI-Generated"
@@ -81,4 +214,4 @@ def analyze_audio_whisper(audio_path):
         }
     ]
 
-    return verdict, confidence, reasons
+    return verdict, confidence, reasons, info
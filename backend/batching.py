@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent single-item calls into one call of `batch_fn`.
+
+    `batch_fn` takes a list of items and returns a list of results in the
+    same order. A batch is flushed when it reaches `max_batch_size` or when
+    the oldest item has waited `max_wait_ms`. `submit` gives up after
+    `timeout` seconds rather than waiting on a stuck batch forever.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10, timeout=60):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._pid = None
+
+    def submit(self, item):
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((item, future))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Still queued: drop it so the worker skips it.
+            future.cancel()
+            raise
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == pid and self._worker.is_alive():
+                return
+
+            # Threads do not survive fork, and the inherited queue may hold
+            # a lock taken by a parent thread, so start clean in the child.
+            if self._pid != pid:
+                self._queue = queue.Queue()
+
+            self._worker = threading.Thread(
+                target=self._run,
+                name="micro-batcher",
+                daemon=True
+            )
+            self._worker.start()
+            self._pid = pid
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            results = list(results)
+            if len(results) != len(batch):
+                error = RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
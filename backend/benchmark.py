@@ -0,0 +1,347 @@
+"""
+Benchmark harness.
+
+Generates deterministic synthetic media, runs every analyzer in-process
+and through the Flask test client, and reports throughput, p50/p95/p99
+latency and peak RSS per case.
+
+    python benchmark.py --iterations 20 --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.15
+
+With --baseline, a case regresses when its p50 or p95 latency grows, or
+its throughput drops, by more than --threshold (a fraction); the run
+then exits with status 1. Result caches are disabled unless --cache is
+given, so repeated calls measure real work.
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyzer benchmark")
+    parser.add_argument("--mode", choices=("inprocess", "client", "both"), default="both")
+    parser.add_argument("--cases", default="", help="comma-separated case name filter (default: all)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per case (model loading)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the result and link fetch caches on")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression fraction")
+    return parser.parse_args()
+
+
+# --- fixtures ---------------------------------------------------------------
+
+def _face(draw, cx, cy, r):
+    # A face-like drawing: skin ellipse, eyes, nose and mouth.
+    draw.ellipse((cx - r, cy - int(r * 1.25), cx + r, cy + int(r * 1.25)), fill=(224, 172, 140))
+    for dx in (-0.4, 0.4):
+        ex = cx + int(dx * r)
+        draw.ellipse((ex - r // 6, cy - r // 3 - r // 10, ex + r // 6, cy - r // 3 + r // 10), fill=(250, 250, 250))
+        draw.ellipse((ex - r // 14, cy - r // 3 - r // 14, ex + r // 14, cy - r // 3 + r // 14), fill=(40, 30, 20))
+    draw.polygon([(cx, cy - r // 8), (cx - r // 8, cy + r // 4), (cx + r // 8, cy + r // 4)], fill=(200, 140, 110))
+    draw.arc((cx - r // 2, cy + r // 4, cx + r // 2, cy + int(r * 0.75)), 20, 160, fill=(150, 40, 40), width=max(2, r // 15))
+
+
+def synthetic_image(rng, size, faces):
+    w, h = size
+
+    # Textured at a quarter of the size and scaled up, so large fixtures
+    # do not inflate the process's peak RSS before any case runs.
+    sw, sh = max(1, w // 4), max(1, h // 4)
+    y, x = np.mgrid[0:sh, 0:sw].astype(np.float32)
+    base = np.stack([x * 255 / sw, y * 255 / sh, (x + y) * 127 / (sw + sh) + 64], axis=-1)
+    noise = rng.standard_normal(base.shape, dtype=np.float32) * 6
+    image = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).resize(size, Image.BICUBIC)
+
+    draw = ImageDraw.Draw(image)
+    for i in range(faces):
+        r = min(w, h) // (4 + faces)
+        _face(draw, (i + 1) * w // (faces + 1), h // 2, r)
+
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def synthetic_video(path, seconds, fps=25, size=(320, 240)):
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+    for f in range(int(seconds * fps)):
+        image = Image.new("RGB", size, (90 + f % 30, 110, 130))
+        draw = ImageDraw.Draw(image)
+        cx = w // 2 + int(20 * np.sin(f / 12))
+        cy = h // 2 + int(8 * np.cos(f / 9))
+        _face(draw, cx, cy, h // 4)
+        writer.write(cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR))
+
+    writer.release()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def synthetic_audio(rng, seconds, sr=16000):
+    import soundfile as sf
+
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = 120 + 25 * np.sin(2 * np.pi * 0.7 * t)
+    voiced = np.sin(2 * np.pi * np.cumsum(pitch) / sr) * (np.sin(2 * np.pi * 1.5 * t) > -0.2)
+    audio = 0.3 * voiced + 0.01 * rng.standard_normal(len(t))
+
+    buf = io.BytesIO()
+    sf.write(buf, audio.astype(np.float32), sr, format="WAV")
+    return buf.getvalue()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/redirect/"):
+            hops = int(self.path.rsplit("/", 1)[1])
+            self.send_response(302)
+            self.send_header("Location", f"/redirect/{hops - 1}" if hops > 1 else "/phish")
+            self.end_headers()
+            return
+
+        body = b"<html><body>" + b"lorem ipsum " * 4000
+        if self.path == "/phish":
+            body += b"Urgent action required: verify your account"
+        body += b"</body></html>"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_link_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_fixtures(workdir, seed):
+    rng = np.random.default_rng(seed)
+    stub = start_link_stub()
+    base = f"http://127.0.0.1:{stub.server_address[1]}"
+    short_path = os.path.join(workdir, "short.mp4")
+    long_path = os.path.join(workdir, "long.mp4")
+
+    return stub, {
+        "image_noface": synthetic_image(rng, (1024, 768), faces=0),
+        "image_faces": synthetic_image(rng, (1600, 1200), faces=3),
+        "image_large": synthetic_image(rng, (6000, 4000), faces=1),
+        "video_short": synthetic_video(short_path, 2),
+        "video_long": synthetic_video(long_path, 20),
+        "video_short_path": short_path,
+        "video_long_path": long_path,
+        "audio_short": synthetic_audio(rng, 5),
+        "audio_long": synthetic_audio(rng, 60),
+        "link_clean": base + "/clean",
+        "link_phish": base + "/redirect/3",
+    }
+
+
+# --- cases ------------------------------------------------------------------
+
+def inprocess_cases(fixtures):
+    import app
+    from audio_whisper import analyze_audio_whisper
+    from image_io import decode_image
+    from link_forensics import analyze_link_forensics
+    from video_forensics import analyze_video_forensics
+    from video_timesformer import timesformer_ai_score
+    from video_utils import analyze_video
+
+    def image(data):
+        views = decode_image(data)
+        return app.image_result(app.face_only_fft_score(views), app.clip_ai_score(views.clip))
+
+    cases = {}
+    for name in ("image_noface", "image_faces", "image_large"):
+        cases[f"inprocess/{name}"] = (lambda d=fixtures[name]: image(d))
+    for name in ("video_short", "video_long"):
+        path = fixtures[name + "_path"]
+        cases[f"inprocess/video_forensics/{name}"] = (lambda p=path: analyze_video_forensics(p))
+        cases[f"inprocess/timesformer/{name}"] = (lambda p=path: timesformer_ai_score(p))
+        cases[f"inprocess/face_embedding/{name}"] = (lambda p=path: analyze_video(p))
+    for name in ("audio_short", "audio_long"):
+        cases[f"inprocess/{name}"] = (lambda d=fixtures[name]: analyze_audio_whisper(d))
+    for name in ("link_clean", "link_phish"):
+        cases[f"inprocess/{name}"] = (lambda u=fixtures[name]: analyze_link_forensics(u))
+    return cases
+
+
+def client_cases(fixtures):
+    import app
+
+    client = app.app.test_client()
+
+    def post_file(route, data, filename):
+        response = client.post(route, data={"file": (io.BytesIO(data), filename)})
+        if response.status_code != 200:
+            raise RuntimeError(f"{route} returned {response.status_code}")
+        return response
+
+    def post_link(url):
+        response = client.post("/analyze/link", json={"url": url})
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze/link returned {response.status_code}")
+        return response
+
+    cases = {}
+    for name in ("image_noface", "image_faces", "image_large"):
+        cases[f"client/{name}"] = (lambda d=fixtures[name]: post_file("/analyze/image", d, "image.jpg"))
+    for name in ("video_short", "video_long"):
+        cases[f"client/{name}"] = (lambda d=fixtures[name]: post_file("/analyze/video", d, "video.mp4"))
+
+    # The same inputs with cheap signals first; compare against the cases above.
+    for name in ("image_noface", "image_faces", "image_large"):
+        cases[f"client/cascade/{name}"] = (lambda d=fixtures[name]: post_file("/analyze/image?cascade=1", d, "image.jpg"))
+    for name in ("video_short", "video_long"):
+        cases[f"client/cascade/{name}"] = (lambda d=fixtures[name]: post_file("/analyze/video?cascade=1", d, "video.mp4"))
+
+    for name in ("audio_short", "audio_long"):
+        cases[f"client/{name}"] = (lambda d=fixtures[name]: post_file("/analyze/audio", d, "audio.wav"))
+    for name in ("link_clean", "link_phish"):
+        cases[f"client/{name}"] = (lambda u=fixtures[name]: post_link(u))
+    return cases
+
+
+def disable_caches():
+    import app
+    import link_forensics
+    from result_cache import ResultCache, TTLCache
+
+    app.result_cache = ResultCache(max_items=0)
+    link_forensics.fetch_cache = TTLCache(max_items=0)
+
+
+# --- measurement ------------------------------------------------------------
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(fn, iterations, warmup):
+    rss_before = peak_rss_mb()
+
+    try:
+        for _ in range(warmup):
+            fn()
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        message = str(e).splitlines()[0] if str(e) else ""
+        return {"error": f"{type(e).__name__}: {message}"}
+
+    ms = np.asarray(latencies) * 1000
+    return {
+        "iterations": iterations,
+        "throughput_per_s": round(iterations / elapsed, 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of (case, reason) for every regression."""
+    regressions = []
+
+    for case, current in results.items():
+        before = baseline.get(case)
+        if not before or "error" in current or "error" in before:
+            continue
+
+        for key in ("p50_ms", "p95_ms"):
+            if current[key] > before[key] * (1 + threshold):
+                regressions.append((case, f"{key} {before[key]} -> {current[key]}"))
+
+        if current["throughput_per_s"] < before["throughput_per_s"] * (1 - threshold):
+            regressions.append((
+                case,
+                f"throughput_per_s {before['throughput_per_s']} -> {current['throughput_per_s']}"
+            ))
+
+    return regressions
+
+
+def main():
+    args = parse_args()
+    filters = [f.strip() for f in args.cases.split(",") if f.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        stub, fixtures = build_fixtures(workdir, args.seed)
+
+        if not args.cache:
+            disable_caches()
+
+        cases = {}
+        if args.mode in ("inprocess", "both"):
+            cases.update(inprocess_cases(fixtures))
+        if args.mode in ("client", "both"):
+            cases.update(client_cases(fixtures))
+
+        results = {}
+        for case, fn in cases.items():
+            if filters and not any(f in case for f in filters):
+                continue
+
+            results[case] = result = run_case(fn, args.iterations, args.warmup)
+
+            if "error" in result:
+                print(f"{case:45s} error: {result['error']}")
+            else:
+                print(
+                    f"{case:45s} {result['throughput_per_s']:8.2f}/s "
+                    f"p50={result['p50_ms']:9.1f}ms p95={result['p95_ms']:9.1f}ms "
+                    f"p99={result['p99_ms']:9.1f}ms rss={result['peak_rss_mb']:7.1f}MB "
+                    f"(+{result['rss_growth_mb']:.1f})"
+                )
+
+        stub.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+        for case, reason in regressions:
+            print(f"REGRESSION {case}: {reason}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+STRATEGIES = ("uniform", "keyframe", "scene")
+
+VIDEO_SAMPLING = os.environ.get("VIDEO_SAMPLING", "uniform")
+VIDEO_FRAME_BUDGET = int(os.environ.get("VIDEO_FRAME_BUDGET", 150))
+VIDEO_RUN_LENGTH = int(os.environ.get("VIDEO_RUN_LENGTH", 15))
+
+# Below this gap, grabbing forward is cheaper than a seek, which has to
+# restart decoding from the previous keyframe.
+SEEK_GAP = 32
+
+# Scene detection probes this many candidate positions per sampled run.
+SCENE_PROBES_PER_RUN = 3
+
+
+def uniform_runs(total_frames, budget, run_length):
+    """
+    Splits `budget` frames into runs of consecutive frames spread evenly
+    over the clip. Short clips come back as a single run of every frame.
+    """
+    if total_frames <= budget:
+        return [(0, total_frames)]
+
+    run_length = max(1, min(run_length, budget))
+    count = max(1, budget // run_length)
+
+    if count == 1:
+        return [((total_frames - run_length) // 2, run_length)]
+
+    span = total_frames - run_length
+    return [(round(i * span / (count - 1)), run_length) for i in range(count)]
+
+
+def coarse_to_fine_order(count):
+    """
+    Orders `count` runs so that every prefix is spread over the whole
+    clip: first and last, then the middle, then the quarter points, ...
+    """
+    if count <= 2:
+        return list(range(count))
+
+    order = [0, count - 1]
+    spans = [(0, count - 1)]
+    while spans:
+        next_spans = []
+        for lo, hi in spans:
+            if hi - lo < 2:
+                continue
+            mid = (lo + hi) // 2
+            order.append(mid)
+            next_spans += [(lo, mid), (mid, hi)]
+        spans = next_spans
+    return order
+
+
+def _histogram(frame):
+    import cv2
+
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    hist = cv2.calcHist([gray], [0], None, [32], [0, 256]).ravel()
+    return hist / (hist.sum() + 1e-8)
+
+
+class VideoSampler:
+    """
+    Plans which frames to decode and yields them as (frame_index, rgb).
+
+    - uniform: evenly spaced runs of consecutive frames, reached by seeking.
+    - keyframe: the same targets snapped to the nearest preceding keyframe,
+      so no frames are decoded just to reach a target (needs PyAV; falls
+      back to uniform without it).
+    - scene: runs start where cheap histogram probes show the largest
+      content change.
+
+    With `coarse_to_fine`, runs are read in coarse_to_fine_order instead
+    of time order, so a consumer that stops early has still seen the
+    whole clip.
+
+    Frames are marked read-only. Consumers can tell runs apart because the
+    frame index jumps between them.
+    """
+
+    def __init__(self, video_path, budget=None, strategy=None, run_length=None, coarse_to_fine=False):
+        self.video_path = video_path
+        self.budget = budget or VIDEO_FRAME_BUDGET
+        self.strategy = strategy or VIDEO_SAMPLING
+        self.run_length = run_length or VIDEO_RUN_LENGTH
+
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {self.strategy}")
+
+        import cv2
+
+        self.cap = cv2.VideoCapture(video_path)
+        self.cap_moved = False
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+        if self.total_frames <= 0:
+            # Unknown length (some containers); read from the start.
+            self.runs = [(0, self.budget)]
+        elif self.strategy == "scene" and self.total_frames > self.budget:
+            self.runs = self._scene_runs()
+        else:
+            self.runs = uniform_runs(self.total_frames, self.budget, self.run_length)
+
+        if coarse_to_fine:
+            self.runs = [self.runs[i] for i in coarse_to_fine_order(len(self.runs))]
+
+        self.expected_frames = sum(length for _, length in self.runs)
+
+    def _scene_runs(self):
+        import cv2
+
+        run_length = max(1, min(self.run_length, self.budget))
+        count = max(1, self.budget // run_length)
+        probes = uniform_runs(self.total_frames, count * SCENE_PROBES_PER_RUN, 1)
+
+        positions = []
+        changes = []
+        prev = None
+        self.cap_moved = True
+
+        for start, _ in probes:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            ret, frame = self.cap.read()
+            if not ret:
+                continue
+
+            hist = _histogram(frame)
+            positions.append(start)
+            changes.append(np.inf if prev is None else float(np.abs(hist - prev).sum()))
+            prev = hist
+
+        if not positions:
+            return uniform_runs(self.total_frames, self.budget, self.run_length)
+
+        order = np.argsort(changes)[::-1][:count]
+        starts = sorted(min(positions[i], self.total_frames - run_length) for i in order)
+
+        runs = []
+        next_free = 0
+        for start in starts:
+            start = max(start, next_free)
+            if start + run_length > self.total_frames:
+                break
+            runs.append((start, run_length))
+            next_free = start + run_length
+
+        return runs
+
+    def __iter__(self):
+        if self.strategy == "keyframe" and av is not None and len(self.runs) > 1:
+            frames = self._read_keyframe_runs()
+        else:
+            frames = self._read_runs()
+
+        for index, rgb in frames:
+            rgb.flags.writeable = False
+            yield index, rgb
+
+    def _read_runs(self):
+        import cv2
+
+        cap = self.cap
+        if self.cap_moved:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        pos = 0
+
+        for start, length in self.runs:
+            if start < pos or start - pos > SEEK_GAP:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            else:
+                while pos < start:
+                    if not cap.grab():
+                        return
+                    pos += 1
+            pos = start
+
+            for index in range(start, start + length):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                pos = index + 1
+                yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def _read_keyframe_runs(self):
+        seen = set()
+
+        with av.open(self.video_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            fps = float(stream.average_rate or self.fps)
+            offset = stream.start_time or 0
+            offset_seconds = float(offset * stream.time_base)
+
+            for start, length in self.runs:
+                target = offset + int(start / fps / stream.time_base)
+                container.seek(target, backward=True, any_frame=False, stream=stream)
+
+                taken = 0
+                for frame in container.decode(stream):
+                    if frame.time is None:
+                        continue
+
+                    index = int(round((frame.time - offset_seconds) * fps))
+                    # Runs snapped to one keyframe overlap; keep the first copy.
+                    if index in seen:
+                        continue
+
+                    yield index, frame.to_ndarray(format="rgb24")
+                    seen.add(index)
+                    taken += 1
+                    if taken >= length:
+                        break
+
+    def close(self):
+        self.cap.release()
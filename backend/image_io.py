@@ -0,0 +1,93 @@
+import io
+import math
+import os
+
+from PIL import Image, ImageOps
+
+
+# Largest image (in pixels) ever held in memory. JPEGs are decoded
+# straight to a reduced scale that fits it; other formats are reduced
+# right after decoding.
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 4 * 1024 * 1024))
+
+# The face detector does not need more than this on the longer side.
+DETECT_MAX_SIDE = int(os.environ.get("DETECT_MAX_SIDE", 1024))
+
+# Matches the FFT fallback cap, so that view is scored without resizing.
+FFT_MAX_SIDE = int(os.environ.get("FFT_MAX_SIDE", 1024))
+
+# CLIP resizes the shorter side to 224 and centre-crops; handing it that
+# size already makes its own resize a no-op.
+CLIP_SHORT_SIDE = 224
+
+ORIENTATION_TAG = 0x0112
+
+
+def _fit_long_side(image, max_side):
+    if max(image.size) <= max_side:
+        return image
+
+    scale = max_side / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+
+def _fit_short_side(image, side):
+    if min(image.size) <= side:
+        return image
+
+    scale = side / min(image.size)
+    size = (max(side, round(image.width * scale)), max(side, round(image.height * scale)))
+    return image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+
+class ImageViews:
+    """
+    One decoded upload and the differently sized copies each analyzer
+    reads: `base` (within the pixel budget, used for face crops),
+    `detect` for MTCNN, `fft` for the whole-image spectrum and `clip`.
+    `detect_scale` maps detector coordinates back onto `base`.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.detect = _fit_long_side(base, DETECT_MAX_SIDE)
+
+        # Each smaller view is resized from the smallest one already made
+        # that is still big enough.
+        source = self.detect if FFT_MAX_SIDE <= DETECT_MAX_SIDE else base
+        self.fft = _fit_long_side(source, FFT_MAX_SIDE)
+        self.clip = _fit_short_side(min(self.detect, self.fft, key=lambda im: im.width), CLIP_SHORT_SIDE)
+
+        self.detect_scale = base.width / self.detect.width
+
+
+def decode_image(data, max_pixels=IMAGE_MAX_PIXELS):
+    """
+    Decodes uploaded bytes once, at no more than `max_pixels`, upright
+    according to its EXIF orientation, and returns its ImageViews.
+    """
+    image = Image.open(io.BytesIO(data))
+
+    scale = min(1.0, math.sqrt(max_pixels / (image.width * image.height)))
+
+    if scale < 1.0:
+        # JPEG only: the decoder skips straight to the smallest 1/2, 1/4
+        # or 1/8 scale no smaller than the budget's size; the resize below
+        # takes it the rest of the way.
+        image.draft("RGB", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+
+    # exif_transpose copies the image even when there is nothing to do.
+    if image.getexif().get(ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    pixels = image.width * image.height
+    if pixels > max_pixels:
+        scale = math.sqrt(max_pixels / pixels)
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+    return ImageViews(image)
@@ -0,0 +1,78 @@
+import os
+import warnings
+
+
+BACKENDS = ("eager", "int8", "compiled")
+
+# Default for every model, overridden per model by INFERENCE_BACKENDS,
+# e.g. "clip=int8,whisper=int8,effnet=compiled".
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "eager")
+
+
+def _parse_backends(spec):
+    backends = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, backend = (part.strip() for part in item.split("=", 1))
+        backends[name] = backend
+    return backends
+
+
+INFERENCE_BACKENDS = _parse_backends(os.environ.get("INFERENCE_BACKENDS", ""))
+
+
+def backend_for(name):
+    backend = INFERENCE_BACKENDS.get(name, INFERENCE_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend for {name}: {backend}")
+    return backend
+
+
+def _quantize_int8(module):
+    import torch
+
+    # Weights of every nn.Linear are stored as int8 and activations are
+    # quantised on the fly; convolutions stay fp32.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _compile(module):
+    import torch
+
+    # Shapes vary with batch size and clip length; dynamic avoids a
+    # recompile for each new one.
+    return torch.compile(module, dynamic=True)
+
+
+def apply_backend(model, backend, hot_modules=("",), device="cpu"):
+    """
+    Returns `model` prepared for `backend`.
+
+    `hot_modules` names the attributes callers actually run ("" for the
+    model itself). "compiled" wraps those with torch.compile; "int8"
+    quantises the whole model. int8 dynamic quantisation only runs on
+    CPU, so it falls back to eager on other devices.
+    """
+    if backend == "eager":
+        return model
+
+    if backend == "int8":
+        if device != "cpu":
+            return model
+        return _quantize_int8(model)
+
+    if backend == "compiled":
+        for path in hot_modules:
+            if not path:
+                model = _compile(model)
+                continue
+
+            parent, _, attr = path.rpartition(".")
+            owner = model.get_submodule(parent) if parent else model
+            setattr(owner, attr, _compile(getattr(owner, attr)))
+        return model
+
+    raise ValueError(f"Unknown inference backend: {backend}")
@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobStore:
+    """
+    Runs long analyses on a bounded thread pool and keeps their status.
+
+    Records live in memory. When `jobs_dir` is set they are also written
+    there as JSON, so any worker process that shares the directory can
+    answer a status query. Finished jobs expire after `ttl_seconds`.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, ttl_seconds=3600, jobs_dir=None):
+        self.max_pending = max(1, int(max_pending))
+        self.ttl_seconds = float(ttl_seconds)
+        self.jobs_dir = jobs_dir
+
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pending = 0
+        self._max_workers = max(1, int(max_workers))
+        self._executor = None
+        self._pid = None
+        self._last_sweep = 0.0
+
+        if self.jobs_dir:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def _pool(self):
+        # The pool's threads do not survive fork; each worker makes its own.
+        if self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="job"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, kind, fn, *args):
+        """
+        Queues `fn(*args)` and returns the new job record, or None when
+        `max_pending` jobs are already queued or running.
+        """
+        self._expire()
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            job = dict(job)
+            pool = self._pool()
+
+        self._save(job)
+        pool.submit(self._run, job["id"], fn, args)
+        return job
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status="running", started_at=time.time())
+
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status="done", result=result, finished_at=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job = dict(job)
+        self._save(job)
+
+    def get(self, job_id):
+        self._expire()
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+
+        return self._load(job_id)
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, job_id + ".json")
+
+    def _save(self, job):
+        if not self.jobs_dir:
+            return
+
+        path = self._path(job["id"])
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _load(self, job_id):
+        if not self.jobs_dir or len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self._expired(job, time.time()):
+            return None
+        return job
+
+    def _expired(self, job, now):
+        finished = job.get("finished_at")
+        return finished is not None and now - finished > self.ttl_seconds
+
+    def _expire(self):
+        now = time.time()
+
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if self._expired(job, now)
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        if not self.jobs_dir:
+            return
+
+        for job_id in expired:
+            try:
+                os.remove(self._path(job_id))
+            except OSError:
+                pass
+
+        # Records left by other (or dead) worker processes.
+        if now - self._last_sweep > 60:
+            self._last_sweep = now
+            self._sweep_dir(now)
+
+    def _sweep_dir(self, now):
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            return
+
+        for name in names:
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Counts for this process; `stored` counts records from every worker."""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            stats = {"pid": os.getpid(), "pending": self._pending, "jobs": counts}
+
+        if self.jobs_dir:
+            try:
+                stats["stored"] = sum(name.endswith(".json") for name in os.listdir(self.jobs_dir))
+            except OSError:
+                stats["stored"] = None
+        return stats
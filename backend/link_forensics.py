@@ -1,8 +1,19 @@
+import codecs
+import os
 import re
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit, urlunsplit
 import tldextract
 from bs4 import BeautifulSoup
 
+from phrase_matcher import PhraseMatcher, load_phrases
+from result_cache import TTLCache
+import metrics
+
 
 SUSPICIOUS_TLDS = {
     "xyz", "top", "tk", "ml", "ga", "cf", "gq", "icu", "click"
@@ -12,16 +23,198 @@ URL_SHORTENERS = {
     "bit.ly", "tinyurl.com", "t.co", "goo.gl", "is.gd", "ow.ly"
 }
 
+TRIGGERS = [
+    "verify your account",
+    "urgent action required",
+    "click immediately",
+    "suspended",
+    "confirm identity",
+    "limited time"
+]
 
-def analyze_link_forensics(url):
-    score = 0
-    reasons = []
+# Optional phrase list file (one phrase per line, any language) used
+# instead of TRIGGERS.
+LINK_TRIGGERS_FILE = os.environ.get("LINK_TRIGGERS_FILE")
+TRIGGER_PHRASES = load_phrases(LINK_TRIGGERS_FILE) if LINK_TRIGGERS_FILE else TRIGGERS
+trigger_matcher = PhraseMatcher(TRIGGER_PHRASES)
+
+# Stop reading a page at the first match (the default), or read up to
+# the byte cap so every occurrence is counted.
+LINK_STOP_ON_MATCH = os.environ.get("LINK_STOP_ON_MATCH", "1") != "0"
+
+DOMAIN_KEYWORDS = PhraseMatcher(["login", "secure", "verify", "account", "auth", "update"])
+
+LINK_CONNECT_TIMEOUT = float(os.environ.get("LINK_CONNECT_TIMEOUT", 3))
+LINK_READ_TIMEOUT = float(os.environ.get("LINK_READ_TIMEOUT", 6))
+LINK_DEADLINE = float(os.environ.get("LINK_DEADLINE", 6))
+LINK_MAX_BYTES = int(os.environ.get("LINK_MAX_BYTES", 1024 * 1024))
+LINK_POOL_SIZE = int(os.environ.get("LINK_POOL_SIZE", 32))
+LINK_MAX_REDIRECTS = 10
+
+# Bulk scans: total concurrent fetches, and concurrent fetches per host.
+LINK_BATCH_WORKERS = int(os.environ.get("LINK_BATCH_WORKERS", 64))
+LINK_PER_HOST = int(os.environ.get("LINK_PER_HOST", 4))
+
+# Page fetches are remembered per URL for this long.
+LINK_CACHE_TTL = float(os.environ.get("LINK_CACHE_TTL", 900))
+LINK_CACHE_ITEMS = int(os.environ.get("LINK_CACHE_ITEMS", 4096))
+
+# Optional local copy of the public suffix list; without it the snapshot
+# bundled with tldextract is used.
+LINK_PSL_FILE = os.environ.get("LINK_PSL_FILE")
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _make_extractor():
+    # No suffix_list_urls means tldextract never downloads the list at
+    # runtime, and no cache_dir means it never writes one either. Private
+    # suffixes (github.io, blogspot.com, pages.dev, ...) count as
+    # suffixes, so each site hosted on one is its own domain.
+    urls = ("file://" + os.path.abspath(LINK_PSL_FILE),) if LINK_PSL_FILE else ()
+    return tldextract.TLDExtract(
+        suffix_list_urls=urls,
+        cache_dir=None,
+        fallback_to_snapshot=True,
+        include_psl_private_domains=True
+    )
+
+
+extract_domain = _make_extractor()
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=LINK_POOL_SIZE,
+        pool_maxsize=LINK_POOL_SIZE,
+        max_retries=0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.max_redirects = LINK_MAX_REDIRECTS
+    return session
+
+
+# Shared so repeated hosts reuse their keep-alive connections.
+session = _make_session()
+
+fetch_cache = TTLCache(LINK_CACHE_ITEMS, LINK_CACHE_TTL)
 
+
+def _iter_body(response):
+    # read1 returns whatever has arrived instead of waiting for a full
+    # chunk, so a server trickling bytes cannot outlast the deadline.
+    raw = response.raw
+    if not hasattr(raw, "read1"):
+        yield from response.iter_content(CHUNK_SIZE)
+        return
+
+    while True:
+        chunk = raw.read1(CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def fetch_page(url, matcher=trigger_matcher, max_bytes=LINK_MAX_BYTES, deadline=LINK_DEADLINE,
+               stop_on_match=LINK_STOP_ON_MATCH):
+    """
+    Streams the page body through `matcher` as it arrives. Reading stops
+    at the first match (unless `stop_on_match` is off), after
+    `max_bytes`, or once `deadline` seconds have passed. Every redirect
+    hop is recorded, and `match_counts` covers the bytes actually read.
+    """
+    started = time.monotonic()
+
+    with session.get(
+        url,
+        timeout=(LINK_CONNECT_TIMEOUT, LINK_READ_TIMEOUT),
+        allow_redirects=True,
+        stream=True
+    ) as response:
+        page = {
+            "status": response.status_code,
+            "final_url": response.url,
+            "redirects": [
+                {"url": hop.url, "status": hop.status_code}
+                for hop in response.history
+            ],
+            "bytes_read": 0,
+            "truncated": False,
+            "matched": [],
+            "match_counts": {},
+        }
+
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        # The scanner carries its state between chunks, so phrases split
+        # across chunk boundaries are still found.
+        scanner = matcher.scanner()
+
+        for chunk in _iter_body(response):
+            page["bytes_read"] += len(chunk)
+
+            if scanner.feed(decoder.decode(chunk)) and stop_on_match:
+                break
+
+            if page["bytes_read"] >= max_bytes or time.monotonic() - started > deadline:
+                page["truncated"] = True
+                break
+        else:
+            scanner.feed(decoder.decode(b"", final=True))
+
+        metrics.inc("bytes_fetched_total", page["bytes_read"])
+        page["matched"] = sorted(scanner.counts)
+        page["match_counts"] = scanner.counts
+
+    return page
+
+
+def cached_fetch(url):
+    """
+    Returns (page, cached). Pages are keyed by the normalised URL: trigger
+    matches and redirects belong to one page, not to every page on its
+    domain. Failed fetches raise and are not cached.
+    """
+    page = fetch_cache.get(url)
+    if page is not None:
+        return page, True
+
+    page = fetch_page(url)
+    fetch_cache.put(url, page)
+    return page, False
+
+
+def normalize_url(url):
+    url = url.strip()
     url = url.replace("[.]", ".")
     url = url.replace("(.)", ".")
     url = url.replace("hxxp://", "http://").replace("hxxps://", "https://")
 
-    
+    # Scheme and host are case-insensitive; path and query are not.
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path,
+        parts.query,
+        parts.fragment
+    ))
+
+
+def static_link_score(url):
+    """URL-only checks. Never touches the network."""
+    score = 0
+    reasons = []
+
     if len(url) > 80:
         score += 15
         reasons.append({
@@ -39,7 +232,7 @@ def analyze_link_forensics(url):
         })
 
     
-    ext = tldextract.extract(url)
+    ext = extract_domain(url)
     domain = f"{ext.domain}.{ext.suffix}"
 
     
@@ -52,8 +245,7 @@ def analyze_link_forensics(url):
         })
 
     
-    security_keywords = ["login", "secure", "verify", "account", "auth", "update"]
-    if any(k in ext.domain.lower() for k in security_keywords):
+    if DOMAIN_KEYWORDS.count(ext.domain):
         score += 25
         reasons.append({
             "title": "Impersonation Keywords in Domain",
@@ -78,11 +270,21 @@ def analyze_link_forensics(url):
             "description": "Shortened links often hide the final destination."
         })
 
-    
+    return score, reasons
+
+
+def network_link_score(url):
+    """Fetches the page and scores what it finds. Returns (score, reasons, page)."""
+    score = 0
+    reasons = []
+    page = None
+
     try:
-        response = requests.get(url, timeout=6, allow_redirects=True)
+        with metrics.timed("link_fetch"):
+            page, cached = cached_fetch(url)
+        page = dict(page, cached=cached)
 
-        if len(response.history) > 2:
+        if len(page["redirects"]) > 2:
             score += 20
             reasons.append({
                 "title": "Multiple Redirects Detected",
@@ -90,21 +292,7 @@ def analyze_link_forensics(url):
                 "description": "Multiple redirects are commonly used in malicious campaigns."
             })
 
-        content = response.text.lower()
-
-        
-        triggers = [
-            "verify your account",
-            "urgent action required",
-            "click immediately",
-            "suspended",
-            "confirm identity",
-            "limited time"
-        ]
-
-        matched = [t for t in triggers if t in content]
-
-        if matched:
+        if page["matched"]:
             score += 25
             reasons.append({
                 "title": "Social Engineering Language",
@@ -120,7 +308,10 @@ def analyze_link_forensics(url):
             "description": "The link could not be reliably accessed."
         })
 
-    
+    return score, reasons, page
+
+
+def link_verdict(score):
     if score >= 50:
         verdict = "Likely Fake"
         confidence = min(95, score)
@@ -133,4 +324,75 @@ def analyze_link_forensics(url):
         verdict = "Real"
         confidence = max(70, 100 - score)
 
-    return verdict, confidence, reasons
+    return verdict, confidence
+
+
+def analyze_link_forensics(url):
+    url = normalize_url(url)
+
+    with metrics.timed("link_static"):
+        score, reasons = static_link_score(url)
+    net_score, net_reasons, page = network_link_score(url)
+
+    verdict, confidence = link_verdict(score + net_score)
+    return verdict, confidence, reasons + net_reasons, page
+
+
+def _host(url):
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def _interleave_hosts(indices, hosts):
+    # Round-robin over hosts so the first tasks the pool picks up hit
+    # different hosts instead of queueing behind one host's limit.
+    groups = {}
+    for i in indices:
+        groups.setdefault(hosts[i], []).append(i)
+
+    order = []
+    queues = list(groups.values())
+    while queues:
+        order.extend(q.pop(0) for q in queues)
+        queues = [q for q in queues if q]
+    return order
+
+
+def scan_links(urls, max_workers=LINK_BATCH_WORKERS, per_host=LINK_PER_HOST):
+    """
+    Analyses many links at once. Static checks run up front; page fetches
+    run on `max_workers` threads with at most `per_host` fetches to any one
+    host at a time. Yields (index, (verdict, confidence, reasons, page))
+    as each link finishes, so results arrive out of order.
+    """
+    if not urls:
+        return
+
+    urls = [normalize_url(u) for u in urls]
+    static = [static_link_score(u) for u in urls]
+    hosts = [_host(u) for u in urls]
+
+    limits = {host: threading.BoundedSemaphore(per_host) for host in set(hosts)}
+
+    def run(i):
+        with limits[hosts[i]]:
+            net_score, net_reasons, page = network_link_score(urls[i])
+
+        score, reasons = static[i]
+        verdict, confidence = link_verdict(score + net_score)
+        return i, (verdict, confidence, reasons + net_reasons, page)
+
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(urls))),
+        thread_name_prefix="link"
+    )
+
+    try:
+        futures = [pool.submit(run, i) for i in _interleave_hosts(range(len(urls)), hosts)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A streaming client that hangs up should not leave fetches queued.
+        pool.shutdown(wait=False, cancel_futures=True)
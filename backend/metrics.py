@@ -0,0 +1,285 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+PREFIX = "deepfake"
+
+# With METRICS_DIR set (serve.py sets one for more than one worker), each
+# process writes its values there every METRICS_FLUSH_SECONDS and
+# render() adds up the values of every process.
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1))
+
+# Upper bounds in seconds, from a cache hit to a long video.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> Histogram
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_help = {}
+
+_local = threading.local()
+
+_dirty = False
+_flusher = None
+
+
+def _reset_after_fork():
+    # A worker starts from zero; the parent's values stay in its own file.
+    global _lock, _dirty, _flusher
+    _lock = threading.Lock()
+    _histograms.clear()
+    _counters.clear()
+    _gauges.clear()
+    _dirty = False
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _changed():
+    # Called with _lock held.
+    global _dirty, _flusher
+    _dirty = True
+    if METRICS_DIR and _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+        _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        if _dirty:
+            flush()
+
+
+def _snapshot():
+    with _lock:
+        return {
+            "histograms": [
+                [name, labels, list(h.counts), h.sum, h.count, list(h.buckets)]
+                for (name, labels), h in _histograms.items()
+            ],
+            "counters": [[name, labels, value] for (name, labels), value in _counters.items()],
+            "gauges": [[name, labels, value] for (name, labels), value in _gauges.items()],
+        }
+
+
+def flush():
+    """Writes this process's values to METRICS_DIR."""
+    global _dirty
+    if not METRICS_DIR:
+        return
+
+    _dirty = False
+    snapshot = _snapshot()
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _collect():
+    """
+    Merged values of every process writing to METRICS_DIR. Counters and
+    histograms of exited workers still count; their gauges do not.
+    """
+    flush()
+
+    histograms = {}
+    counters = {}
+    gauges = {}
+
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        names = []
+
+    for name in names:
+        pid, ext = os.path.splitext(name)
+        if ext != ".json" or not pid.isdigit():
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name), "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        for n, labels, counts, total, count, buckets in snapshot["histograms"]:
+            key = (n, tuple(map(tuple, labels)))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = (counts, total, count, tuple(buckets))
+            else:
+                histograms[key] = (
+                    [a + b for a, b in zip(merged[0], counts)],
+                    merged[1] + total,
+                    merged[2] + count,
+                    merged[3]
+                )
+
+        for n, labels, value in snapshot["counters"]:
+            key = (n, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+
+        if _alive(int(pid)):
+            for n, labels, value in snapshot["gauges"]:
+                key = (n, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+
+    return histograms, counters, gauges
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def observe(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(value)
+        _changed()
+
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        _changed()
+
+
+def set_gauge(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+        _changed()
+
+
+def observe_stage(stage, seconds):
+    """Records one run of `stage`, and adds it to the current request's breakdown."""
+    observe("stage_seconds", seconds, stage=stage)
+
+    breakdown = getattr(_local, "timings", None)
+    if breakdown is not None:
+        breakdown[stage] = breakdown.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def start_request():
+    """Starts collecting a per-stage breakdown for this thread's request."""
+    _local.timings = {}
+
+
+def finish_request():
+    """Returns the breakdown in milliseconds and stops collecting."""
+    timings = getattr(_local, "timings", None) or {}
+    _local.timings = None
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    if METRICS_DIR:
+        histograms, counters, gauges = _collect()
+    else:
+        with _lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in _histograms.items()}
+            counters = dict(_counters)
+            gauges = dict(_gauges)
+
+    lines = []
+
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({name for name, _ in values}):
+            full = f"{PREFIX}_{name}"
+            if name in _help:
+                lines.append(f"# HELP {full} {_help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            for (n, labels), value in sorted(values.items()):
+                if n == name:
+                    lines.append(f"{full}{_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        full = f"{PREFIX}_{name}"
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} histogram")
+        for (n, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(buckets, counts):
+                cumulative += c
+                lines.append(f"{full}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{full}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{full}_sum{_labels(labels)} {total}")
+            lines.append(f"{full}_count{_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("stage_seconds", "Time spent in each analysis stage.")
+describe("request_seconds", "Request latency per endpoint.")
+describe("requests_total", "Requests per endpoint and status code.")
+describe("frames_processed_total", "Video frames decoded and fed to analyzers.")
+describe("faces_found_total", "Faces returned by the face detector.")
+describe("bytes_fetched_total", "Page bytes read while analysing links.")
+describe("lane_active", "Requests currently running in each admission lane.")
+describe("lane_queue_depth", "Requests waiting for a slot in each admission lane.")
+describe("lane_rejected_total", "Requests turned away by each admission lane.")
@@ -0,0 +1,182 @@
+import functools
+import threading
+import time
+
+from inference_backends import apply_backend, backend_for
+
+
+CLIP_NAME = "openai/clip-vit-base-patch32"
+WHISPER_NAME = "openai/whisper-base"
+TIMESFORMER_NAME = "facebook/timesformer-base-finetuned-k400"
+
+# Smallest face MTCNN looks for; its image pyramid fails on images whose
+# shorter side is below this.
+MTCNN_MIN_FACE_SIZE = 40
+
+# Models whose inference backend is selectable (see inference_backends).
+BACKEND_MODELS = ("clip", "whisper", "timesformer", "effnet")
+
+_loaders = {}
+_locks = {}
+_models = {}
+_load_seconds = {}
+_errors = {}
+_registry_lock = threading.Lock()
+
+
+def register_model(name, loader):
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+
+
+def model_loader(name):
+    def decorator(fn):
+        register_model(name, fn)
+        return fn
+    return decorator
+
+
+def get_model(name):
+    """
+    Returns the named model, loading it on first use. Concurrent first
+    callers wait on the same load instead of loading twice.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    if name not in _loaders:
+        raise KeyError(f"Unknown model: {name}")
+
+    with _locks[name]:
+        if name in _models:
+            return _models[name]
+
+        start = time.perf_counter()
+        try:
+            model = _loaders[name]()
+        except Exception as e:
+            _errors[name] = str(e)
+            raise
+
+        _models[name] = model
+        _load_seconds[name] = round(time.perf_counter() - start, 3)
+        _errors.pop(name, None)
+
+    return model
+
+
+def set_model(name, model):
+    """Installs an already built model under `name` (parity checks, tests)."""
+    with _locks[name]:
+        _models[name] = model
+        _errors.pop(name, None)
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def registered_models():
+    return list(_loaders)
+
+
+def warmup(names=None):
+    for name in names or registered_models():
+        try:
+            get_model(name)
+        except Exception:
+            pass
+    return status()
+
+
+def status():
+    return {
+        name: {
+            "loaded": name in _models,
+            "load_seconds": _load_seconds.get(name),
+            "error": _errors.get(name),
+            "backend": backend_for(name) if name in BACKEND_MODELS else None,
+        }
+        for name in _loaders
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+
+@model_loader("clip")
+def _load_clip(backend=None):
+    from transformers import CLIPModel, CLIPProcessor
+
+    model = CLIPModel.from_pretrained(CLIP_NAME).to(get_device())
+    model.eval()
+    model = apply_backend(model, backend or backend_for("clip"), ("vision_model",), get_device())
+    processor = CLIPProcessor.from_pretrained(CLIP_NAME)
+    return model, processor
+
+
+@model_loader("mtcnn")
+def _load_mtcnn():
+    from facenet_pytorch import MTCNN
+
+    # Shared by image and video analysis; faces come back largest first.
+    return MTCNN(
+        keep_all=True,
+        device=get_device(),
+        min_face_size=MTCNN_MIN_FACE_SIZE
+    )
+
+
+@model_loader("whisper")
+def _load_whisper(backend=None):
+    from transformers import WhisperModel, WhisperProcessor
+
+    processor = WhisperProcessor.from_pretrained(WHISPER_NAME)
+    model = WhisperModel.from_pretrained(WHISPER_NAME).to(get_device())
+    model.eval()
+    model = apply_backend(model, backend or backend_for("whisper"), ("encoder",), get_device())
+    return model, processor
+
+
+@model_loader("timesformer")
+def _load_timesformer(backend=None):
+    from transformers import TimesformerForVideoClassification, AutoImageProcessor
+
+    model = TimesformerForVideoClassification.from_pretrained(TIMESFORMER_NAME).to(get_device())
+    model.eval()
+    model = apply_backend(model, backend or backend_for("timesformer"), ("",), get_device())
+    processor = AutoImageProcessor.from_pretrained(TIMESFORMER_NAME)
+    return model, processor
+
+
+@model_loader("effnet")
+def _load_effnet(backend=None):
+    import torch
+    from torchvision import models
+
+    effnet = models.efficientnet_b0(weights="IMAGENET1K_V1")
+    effnet.classifier = torch.nn.Identity()
+    effnet = effnet.to(get_device()).eval()
+    return apply_backend(effnet, backend or backend_for("effnet"), ("",), get_device())
+
+
+@model_loader("face_mesh")
+def _load_face_mesh():
+    import mediapipe as mp
+
+    # FaceMesh tracks state across frames, so each video gets its own
+    # instance from this factory.
+    return functools.partial(
+        mp.solutions.face_mesh.FaceMesh,
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
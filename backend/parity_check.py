@@ -0,0 +1,236 @@
+"""
+Accuracy and latency check for an inference backend against fp32 eager.
+
+Loads each model twice, once eager and once with --backend, runs both
+through the same scoring code on a fixture set, and reports the largest
+score difference, any verdict that changed and the speedup.
+
+    python parity_check.py --backend int8 --models clip,whisper
+    python parity_check.py --backend compiled --fixtures /data/parity
+
+Fixtures are the images, audio and videos found in --fixtures. Without
+it a small seeded synthetic set is generated. Exits with status 1 when a
+score moves more than --tolerance or a verdict changes.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+import model_registry
+from inference_backends import BACKENDS
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".m4a")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".webm")
+
+LOADERS = {
+    "clip": model_registry._load_clip,
+    "whisper": model_registry._load_whisper,
+    "timesformer": model_registry._load_timesformer,
+    "effnet": model_registry._load_effnet,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare an inference backend with fp32 eager")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "eager"], required=True)
+    parser.add_argument("--models", default=",".join(LOADERS), help="comma-separated models to check")
+    parser.add_argument("--fixtures", help="directory of images, audio and videos (default: synthetic)")
+    parser.add_argument("--tolerance", type=float, default=0.03, help="largest allowed score difference")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per backend")
+    return parser.parse_args()
+
+
+def synthetic_fixtures(workdir, seed=0):
+    rng = np.random.default_rng(seed)
+    fixtures = {"image": [], "audio": [], "video": []}
+
+    y, x = np.mgrid[0:480, 0:640]
+    for i in range(6):
+        base = np.stack([(x * (i + 1)) % 256, (y * (i + 2)) % 256, ((x + y) * 3) % 256], axis=-1)
+        noise = rng.normal(0, 4 + 6 * i, base.shape)
+        image = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+        fixtures["image"].append((f"image-{i}", image))
+
+    t = np.arange(16000 * 8) / 16000
+    for i in range(3):
+        pitch = 110 + 40 * i + 20 * np.sin(2 * np.pi * 0.5 * t)
+        voiced = np.sin(2 * np.pi * np.cumsum(pitch) / 16000) * (np.sin(2 * np.pi * 2 * t) > 0)
+        audio = 0.3 * voiced + 0.02 * (i + 1) * rng.standard_normal(len(t))
+        fixtures["audio"].append((f"audio-{i}", audio.astype(np.float32)))
+
+    for i in range(2):
+        path = os.path.join(workdir, f"video-{i}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (224, 224))
+        for f in range(48):
+            frame = np.full((224, 224, 3), 40 * i, dtype=np.uint8)
+            cv2.circle(frame, (40 + 3 * f, 112 + int(30 * np.sin(f / 5))), 30 + 10 * i, (200, 180, 160), -1)
+            writer.write(frame)
+        writer.release()
+        fixtures["video"].append((f"video-{i}", path))
+
+    return fixtures
+
+
+def directory_fixtures(root):
+    from audio_io import decode_audio
+    from image_io import decode_image
+
+    fixtures = {"image": [], "audio": [], "video": []}
+
+    for path in sorted(glob.glob(os.path.join(root, "**", "*"), recursive=True)):
+        name = os.path.relpath(path, root)
+        ext = os.path.splitext(path)[1].lower()
+
+        if ext in IMAGE_EXTENSIONS:
+            with open(path, "rb") as f:
+                fixtures["image"].append((name, decode_image(f.read()).base))
+        elif ext in AUDIO_EXTENSIONS:
+            fixtures["audio"].append((name, decode_audio(path)))
+        elif ext in VIDEO_EXTENSIONS:
+            fixtures["video"].append((name, path))
+
+    return fixtures
+
+
+def check_clip(fixtures):
+    import app
+    from image_io import ImageViews
+
+    views = [ImageViews(image) for _, image in fixtures["image"]]
+    scores = app.clip_ai_scores([v.clip for v in views]) if views else []
+
+    results = {}
+    for (name, _), v, score in zip(fixtures["image"], views, scores):
+        verdict, _ = app.image_decision(app.fft_frequency_score(v.fft), score)
+        results[name] = (score, verdict)
+    return results
+
+
+def check_whisper(fixtures):
+    from audio_whisper import analyze_audio_whisper, whisper_ai_score
+
+    results = {}
+    for name, audio in fixtures["audio"]:
+        results[name] = (whisper_ai_score(audio), analyze_audio_whisper(audio)[0])
+    return results
+
+
+def check_timesformer(fixtures):
+    from video_timesformer import timesformer_ai_score
+
+    results = {}
+    for name, path in fixtures["video"]:
+        score = timesformer_ai_score(path)
+        results[name] = (score, score > 0.5)
+    return results
+
+
+def _whole_frame_faces(frames):
+    # Stand-in for MTCNN: every frame is one face, standardised the same way.
+    faces = torch.from_numpy(np.ascontiguousarray(frames)).permute(0, 3, 1, 2).float()
+    faces = F.interpolate(faces, size=(160, 160), mode="bilinear", align_corners=False)
+    return [[(face - 127.5) / 128.0] for face in faces]
+
+
+def check_effnet(fixtures):
+    from frame_sampling import VideoSampler
+    from video_utils import FaceEmbeddingStage
+
+    model_registry.set_model("mtcnn", _whole_frame_faces)
+
+    results = {}
+    for name, path in fixtures["video"]:
+        stage = FaceEmbeddingStage()
+
+        sampler = VideoSampler(path, stage.max_frames)
+        try:
+            for index, frame in sampler:
+                stage.feed(index, frame)
+        finally:
+            sampler.close()
+
+        verdict, confidence = stage.result()
+        results[name] = (confidence / 100.0, verdict)
+    return results
+
+
+CHECKS = {
+    "clip": check_clip,
+    "whisper": check_whisper,
+    "timesformer": check_timesformer,
+    "effnet": check_effnet,
+}
+
+
+def run(name, backend, fixtures, repeat):
+    model_registry.set_model(name, LOADERS[name](backend=backend))
+
+    if name == "clip":
+        import app
+        model_registry.set_model("clip_text_embeds", app.clip_text_embeddings(app.CLIP_PROMPTS))
+
+    # The first run pays for compilation and lazy initialisation.
+    results = CHECKS[name](fixtures)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        CHECKS[name](fixtures)
+    seconds = (time.perf_counter() - start) / max(1, repeat)
+
+    return results, seconds
+
+
+def main():
+    args = parse_args()
+    names = [n.strip() for n in args.models.split(",") if n.strip()]
+
+    unknown = [n for n in names if n not in LOADERS]
+    if unknown:
+        sys.exit(f"Unknown models: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="parity-") as workdir:
+        fixtures = directory_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(workdir)
+        failed = check_models(names, args, fixtures)
+
+    sys.exit(1 if failed else 0)
+
+
+def check_models(names, args, fixtures):
+    failed = False
+
+    for name in names:
+        reference, ref_seconds = run(name, "eager", fixtures, args.repeat)
+        candidate, seconds = run(name, args.backend, fixtures, args.repeat)
+
+        diffs = [abs(candidate[k][0] - reference[k][0]) for k in reference]
+        flips = [k for k in reference if candidate[k][1] != reference[k][1]]
+        max_diff = max(diffs, default=0.0)
+
+        ok = max_diff <= args.tolerance and not flips
+        failed = failed or not ok
+
+        print(
+            f"{name:12s} {args.backend:9s} fixtures={len(reference):3d} "
+            f"max_diff={max_diff:.4f} flips={len(flips)} "
+            f"eager={ref_seconds * 1000:.0f}ms {args.backend}={seconds * 1000:.0f}ms "
+            f"speedup={ref_seconds / max(seconds, 1e-9):.2f}x {'ok' if ok else 'FAIL'}"
+        )
+        for k in flips:
+            print(f"    verdict changed for {k}: {reference[k][1]} -> {candidate[k][1]}")
+
+    return failed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Without pyahocorasick, lists up to this size are scanned with one
+# str.find pass per phrase, which runs at C speed and beats the
+# pure-Python automaton.
+FIND_MAX_PHRASES = 64
+
+
+def load_phrases(path):
+    """Reads one phrase per line, skipping blank lines and # comments."""
+    phrases = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                phrases.append(line)
+    return phrases
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed phrase list.
+
+    Matching is case-insensitive and costs one pass over the text however
+    many phrases there are. Uses pyahocorasick when it is installed, and
+    otherwise str.find for short lists and a pure-Python automaton for
+    long ones.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(p.lower() for p in phrases if p.strip()))
+        self.max_length = max((len(p) for p in self.phrases), default=0)
+
+        if ahocorasick is not None:
+            self.backend = "ahocorasick"
+            self._automaton = ahocorasick.Automaton()
+            for i, phrase in enumerate(self.phrases):
+                self._automaton.add_word(phrase, (i, len(phrase)))
+            if self.phrases:
+                self._automaton.make_automaton()
+        elif len(self.phrases) <= FIND_MAX_PHRASES:
+            self.backend = "find"
+        else:
+            self.backend = "python"
+            self._build()
+
+    def _build(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for i, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (i,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def scanner(self):
+        return PhraseScanner(self)
+
+    def count(self, text):
+        """Returns {phrase: occurrences} for one complete text."""
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.counts
+
+
+class PhraseScanner:
+    """
+    Streams text through a PhraseMatcher chunk by chunk. Phrases split
+    across chunk boundaries are still found, and `counts` holds the
+    occurrences seen so far.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.counts = {}
+        self._state = 0
+        self._tail = ""
+
+    def feed(self, text):
+        """Scans the next chunk. Returns how many matches it completed."""
+        text = text.lower()
+        if not self.matcher.phrases:
+            return 0
+        if self.matcher.backend == "python":
+            return self._feed_python(text)
+        return self._feed_stateless(text)
+
+    def _add(self, index):
+        phrase = self.matcher.phrases[index]
+        self.counts[phrase] = self.counts.get(phrase, 0) + 1
+
+    def _matches(self, buf):
+        # (end, index) for every occurrence in buf, overlapping ones included.
+        m = self.matcher
+        if m.backend == "ahocorasick":
+            for end, (index, _) in m._automaton.iter(buf):
+                yield end, index
+            return
+
+        for index, phrase in enumerate(m.phrases):
+            start = buf.find(phrase)
+            while start != -1:
+                yield start + len(phrase) - 1, index
+                start = buf.find(phrase, start + 1)
+
+    def _feed_stateless(self, text):
+        # pyahocorasick and str.find keep no state between calls, so
+        # rescan the last max_length - 1 characters and count only
+        # matches that end in the new text.
+        m = self.matcher
+        buf = self._tail + text
+        skip = len(self._tail)
+        found = 0
+
+        for end, index in self._matches(buf):
+            if end >= skip:
+                self._add(index)
+                found += 1
+
+        keep = m.max_length - 1
+        self._tail = buf[-keep:] if keep else ""
+        return found
+
+    def _feed_python(self, text):
+        m = self.matcher
+        goto, fail, out = m._goto, m._fail, m._out
+        state = self._state
+        found = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if out[state]:
+                for index in out[state]:
+                    self._add(index)
+                found += len(out[state])
+
+        self._state = state
+        return found
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(kind, version, payload):
+    """
+    Cache key for one analysis: the analyzer kind, its model/threshold
+    version and a SHA-256 of the uploaded bytes (or normalised URL).
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+
+    h = hashlib.sha256()
+    h.update(f"{kind}:{version}:".encode("utf-8"))
+    h.update(payload)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for JSON-serialisable analysis results.
+
+    The memory tier is an LRU bounded by item count. The optional disk
+    tier stores one JSON file per key under `disk_dir` and evicts the
+    least recently used files once their total size exceeds
+    `disk_max_bytes`.
+
+    Several processes (prefork workers) can share one `disk_dir`: lookups
+    go to the file itself, and the size budget is checked against the
+    directory, rescanned every `rescan_seconds` or whenever this
+    process's own count says it is over budget. File mtimes record use,
+    so eviction is least recently used across all processes.
+    """
+
+    def __init__(self, max_items=1024, disk_dir=None, disk_max_bytes=512 * 1024 * 1024, rescan_seconds=30):
+        self.max_items = max(0, int(max_items))
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.rescan_seconds = float(rescan_seconds)
+        self._last_scan = 0.0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk_index = OrderedDict()  # key -> file size
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._rescan()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _scan_disk(self):
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+
+        return [(key, size) for _, key, size in sorted(entries)]
+
+    def _rescan(self):
+        entries = self._scan_disk()
+
+        with self._lock:
+            self._disk_index = OrderedDict(entries)
+            self._disk_bytes = sum(size for _, size in entries)
+            self._last_scan = time.monotonic()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+
+        # Another process may have written it, so go to the file rather
+        # than trusting this process's index.
+        value = self._read_disk(key) if self.disk_dir else None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+
+        if self.disk_dir:
+            self._write_disk(key, value)
+
+    def _remember(self, key, value):
+        if self.max_items == 0:
+            return
+
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            value = json.loads(data)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                size = self._disk_index.pop(key, 0)
+                self._disk_bytes -= size
+            return None
+
+        with self._lock:
+            if key not in self._disk_index:
+                self._disk_index[key] = len(data)
+                self._disk_bytes += len(data)
+        return value
+
+    def _write_disk(self, key, value):
+        path = self._path(key)
+        data = json.dumps(value).encode("utf-8")
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        with self._lock:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+            stale = time.monotonic() - self._last_scan > self.rescan_seconds
+
+        if stale or self._disk_bytes > self.disk_max_bytes:
+            self._rescan()
+
+        with self._lock:
+            evicted = self._evict_disk()
+
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _evict_disk(self):
+        evicted = []
+        while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+            old_key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(old_key)
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+class TTLCache:
+    """
+    In-memory LRU bounded by item count whose entries also expire
+    `ttl_seconds` after they were stored.
+    """
+
+    def __init__(self, max_items=1024, ttl_seconds=600):
+        self.max_items = max(0, int(max_items))
+        self.ttl_seconds = float(ttl_seconds)
+
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (expires_at, value)
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._items[key]
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_items == 0 or self.ttl_seconds <= 0:
+            return
+
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "items": len(self._items),
+            }
@@ -0,0 +1,176 @@
+"""
+Production entry point.
+
+Loads every model once in the parent process, then forks worker
+processes that serve the Flask app from a shared listening socket. The
+weights are shared copy-on-write between workers instead of being loaded
+once per process.
+
+With more than one worker, job records and metrics go to temporary
+JOBS_DIR and METRICS_DIR directories shared by all workers, unless
+those are configured. Admission lane defaults are split between the
+workers (see admission.LANE_WORKERS); a lane never drops below one slot
+per worker, so e.g. the video lane admits one video per worker.
+
+    python serve.py --workers 4 --port 5000
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Pre-forking production server")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", cpus)))
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.environ.get("TORCH_THREADS", 0)),
+        help="torch intra-op threads per worker (default: cores / workers)"
+    )
+    parser.add_argument(
+        "--models",
+        default=os.environ.get("PRELOAD_MODELS", ""),
+        help="comma-separated models to load before forking (default: all but opt-in signal models)"
+    )
+    parser.add_argument("--backlog", type=int, default=1024)
+    return parser.parse_args()
+
+
+def shared_dir(env_name, prefix):
+    """Creates a temporary directory for `env_name` unless one is configured."""
+    if os.environ.get(env_name):
+        return None
+    path = tempfile.mkdtemp(prefix=f"deepfake-{prefix}-")
+    os.environ[env_name] = path
+    return path
+
+
+def default_models(model_registry):
+    from app import VIDEO_SIGNALS
+
+    # TimeSformer only runs for ?signals=1, so it is not worth its memory
+    # in every worker unless signals are on by default.
+    skip = () if VIDEO_SIGNALS else ("timesformer",)
+    return [name for name in model_registry.registered_models() if name not in skip]
+
+
+def run_worker(app, sock, threads):
+    import torch
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    torch.set_num_threads(threads)
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def main():
+    args = parse_args()
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+
+    import torch
+
+    # Keep torch single-threaded in the parent so children never inherit
+    # a started OpenMP pool; each worker sizes its own pool after fork.
+    torch.set_num_threads(1)
+
+    # Job status is polled from whichever worker accepts the request, and
+    # /metrics is answered by any one worker, so both need state every
+    # worker can read.
+    # Admission lanes are per process; split their defaults between the
+    # workers so the server as a whole keeps roughly the same limits.
+    os.environ["LANE_WORKERS"] = str(workers)
+
+    temp_dirs = []
+    if workers > 1:
+        temp_dirs = [d for d in (shared_dir("JOBS_DIR", "jobs"), shared_dir("METRICS_DIR", "metrics")) if d]
+
+    import model_registry
+    from app import app
+
+    if workers > 1 and model_registry.get_device() == "cuda":
+        sys.exit("CUDA state cannot be shared across fork; use --workers 1 on GPU nodes.")
+
+    names = [n.strip() for n in args.models.split(",") if n.strip()] or default_models(model_registry)
+    for name, info in model_registry.warmup(names).items():
+        if info["error"]:
+            print(f"[serve] failed to load {name}: {info['error']}", file=sys.stderr)
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    # Move everything allocated so far out of the collector's reach so
+    # that gc passes in the workers do not dirty the shared pages.
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, threads)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    print(
+        f"[serve] {workers} workers x {threads} torch threads on {args.host}:{args.port}",
+        file=sys.stderr
+    )
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        children.discard(pid)
+        if not stopping:
+            spawn()
+
+    for path in temp_dirs:
+        shutil.rmtree(path, ignore_errors=True)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
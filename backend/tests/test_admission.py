@@ -0,0 +1,107 @@
+import threading
+import time
+
+import admission
+from admission import Lane
+
+
+def hold(lane, release):
+    assert lane.acquire()
+    release.wait()
+    lane.release()
+
+
+def test_rejects_when_queue_is_full():
+    lane = Lane("test_full", max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=1)
+    release = threading.Event()
+
+    holder = threading.Thread(target=hold, args=(lane, release))
+    holder.start()
+    while lane.active < 1:
+        time.sleep(0.01)
+
+    waiter = threading.Thread(target=hold, args=(lane, release))
+    waiter.start()
+    while lane.waiting < 1:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    assert not lane.acquire()
+    assert time.monotonic() - started < 0.5
+    assert lane.rejected == 1
+
+    release.set()
+    holder.join()
+    waiter.join()
+
+    stats = lane.stats()
+    assert stats["active"] == 0
+    assert stats["waiting"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_times_out_in_queue():
+    lane = Lane("test_timeout", max_concurrent=1, max_queue=4, queue_timeout=0.2, retry_after=1)
+    assert lane.acquire()
+
+    started = time.monotonic()
+    assert not lane.acquire()
+    assert 0.15 <= time.monotonic() - started < 1.0
+    assert lane.timed_out == 1
+    assert lane.waiting == 0
+
+    lane.release()
+    assert lane.acquire()
+    lane.release()
+
+
+def test_waiter_gets_released_slot():
+    lane = Lane("test_handoff", max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=1)
+    assert lane.acquire()
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(lane.acquire()))
+    waiter.start()
+    while lane.waiting < 1:
+        time.sleep(0.01)
+
+    lane.release()
+    waiter.join()
+
+    assert admitted == [True]
+    assert lane.active == 1
+    lane.release()
+
+
+def test_unbounded_acquire_skips_queue_limit():
+    lane = Lane("test_jobs", max_concurrent=1, max_queue=0, queue_timeout=0.05, retry_after=1)
+    assert lane.acquire()
+    assert not lane.acquire()
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(lane.acquire(bounded=False)))
+    waiter.start()
+    time.sleep(0.2)
+    assert admitted == []
+
+    lane.release()
+    waiter.join()
+    assert admitted == [True]
+    lane.release()
+
+
+def test_defaults_are_split_between_workers(monkeypatch):
+    monkeypatch.setattr(admission, "LANE_WORKERS", 4)
+
+    link = admission._lane_from_env("link", (16, 64, 10, 1))
+    video = admission._lane_from_env("video", (1, 4, 60, 30))
+
+    assert (link.max_concurrent, link.max_queue) == (4, 16)
+    assert (video.max_concurrent, video.max_queue) == (1, 1)
+
+
+def test_overrides_are_per_worker(monkeypatch):
+    monkeypatch.setattr(admission, "LANE_WORKERS", 4)
+    monkeypatch.setenv("LANE_LINK_CONCURRENCY", "10")
+
+    assert admission._lane_from_env("link", (16, 64, 10, 1)).max_concurrent == 10
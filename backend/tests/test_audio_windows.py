@@ -0,0 +1,35 @@
+import numpy as np
+
+from audio_whisper import SAMPLE_RATE, split_windows
+
+
+def test_short_clip_is_one_window():
+    y = np.zeros(10 * SAMPLE_RATE, dtype=np.float32)
+    windows = split_windows(y, 30, 5)
+
+    assert len(windows) == 1
+    assert windows[0] is y
+
+
+def test_windows_overlap_and_end_on_the_clip_end():
+    y = np.arange(70 * SAMPLE_RATE, dtype=np.float32)
+    windows = split_windows(y, 30, 5)
+
+    assert [len(w) for w in windows] == [30 * SAMPLE_RATE] * 3
+    assert [w[0] / SAMPLE_RATE for w in windows] == [0, 25, 40]
+    assert windows[-1][-1] == y[-1]
+
+
+def test_exact_fit_adds_no_extra_window():
+    y = np.arange(55 * SAMPLE_RATE, dtype=np.float32)
+    windows = split_windows(y, 30, 5)
+
+    assert [w[0] / SAMPLE_RATE for w in windows] == [0, 25]
+
+
+def test_windows_never_exceed_whisper_input():
+    y = np.zeros(100 * SAMPLE_RATE, dtype=np.float32)
+    windows = split_windows(y, 45, 0)
+
+    assert all(len(w) == 30 * SAMPLE_RATE for w in windows)
+    assert len(windows) == 4
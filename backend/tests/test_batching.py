@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_concurrent_calls_share_a_batch():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(batcher.submit, range(8)))
+
+    assert results == [x * 2 for x in range(8)]
+    assert max(sizes) > 1
+    assert sum(sizes) == 8
+
+
+def test_batch_size_is_capped():
+    sizes = []
+
+    def identity(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(identity, max_batch_size=3, max_wait_ms=50)
+    with ThreadPoolExecutor(10) as pool:
+        list(pool.map(batcher.submit, range(10)))
+
+    assert max(sizes) <= 3
+
+
+def test_exceptions_reach_every_caller():
+    def fail(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fail, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.submit(1)
+
+
+def test_short_result_list_fails_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50, timeout=5)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(batcher.submit, i) for i in range(4)]
+        errors = [f.exception() for f in futures]
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert time.monotonic() - started < 2
+
+
+def test_submit_times_out_on_stuck_batch():
+    release = threading.Event()
+
+    def stuck(items):
+        release.wait()
+        return items
+
+    batcher = MicroBatcher(stuck, max_batch_size=1, max_wait_ms=0, timeout=0.2)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.submit(1)
+        # Queued behind the stuck batch: cancelled, and skipped once the
+        # worker gets to it.
+        with pytest.raises(TimeoutError):
+            batcher.submit(2)
+    finally:
+        release.set()
+
+    batcher.timeout = 5
+    assert batcher.submit(3) == 3
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import app
+
+
+def full_fft_score(img):
+    # The original whole-spectrum score: log magnitude of the shifted FFT
+    # with the low-frequency centre block zeroed.
+    magnitude = np.log(np.abs(np.fft.fftshift(np.fft.fft2(img))) + 1.0)
+    h, w = magnitude.shape
+    c = app.FFT_CENTER
+    magnitude[h//2-c:h//2+c, w//2-c:w//2+c] = 0
+    return float(np.clip(magnitude.mean() / (magnitude.max() + 1e-8), 0.0, 1.0))
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (64, 65), (65, 64), (97, 131), (256, 256)])
+def test_center_weights_cover_full_spectrum(shape):
+    h, w = shape
+    weights = app.fft_center_weights(h, w)
+
+    keep = np.ones((h, w))
+    c = app.FFT_CENTER
+    keep[h//2-c:h//2+c, w//2-c:w//2+c] = 0
+
+    rng = np.random.default_rng(0)
+    img = rng.normal(size=shape)
+    full = np.abs(np.fft.fftshift(np.fft.fft2(img))) * keep
+    half = np.abs(np.fft.rfft2(img)) * weights
+
+    assert weights.shape == (h, w // 2 + 1)
+    assert half.sum() == pytest.approx(full.sum(), rel=1e-6)
+    assert weights.sum() == keep.sum()
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (97, 131), (256, 200)])
+def test_scores_match_full_fft(shape):
+    rng = np.random.default_rng(1)
+    grays = rng.uniform(0, 255, size=(3,) + shape).astype(np.float32)
+
+    scores = app.fft_frequency_scores(grays)
+
+    for gray, score in zip(grays, scores):
+        assert score == pytest.approx(full_fft_score(gray), abs=1e-5)
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+import pytest
+
+from frame_sampling import VideoSampler, coarse_to_fine_order, uniform_runs
+from video_pipeline import FrameStage, run_video_pipeline
+
+
+@pytest.fixture
+def clip(tmp_path):
+    # Each frame's brightness encodes its index, so decoded frames can be
+    # checked against the index the sampler reports.
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (32, 32))
+    for i in range(200):
+        writer.write(np.full((32, 32, 3), i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_short_clip_is_one_run():
+    assert uniform_runs(40, 150, 15) == [(0, 40)]
+
+
+def test_runs_cover_the_clip_evenly():
+    runs = uniform_runs(1000, 150, 15)
+
+    assert len(runs) == 10
+    assert all(length == 15 for _, length in runs)
+    assert runs[0][0] == 0
+    assert runs[-1][0] + 15 == 1000
+    assert [start for start, _ in runs] == sorted(start for start, _ in runs)
+
+
+def test_single_run_is_centred():
+    assert uniform_runs(1000, 10, 15) == [(495, 10)]
+
+
+def test_sampler_yields_the_planned_frames(clip):
+    sampler = VideoSampler(clip, budget=30, strategy="uniform", run_length=10)
+    try:
+        frames = list(sampler)
+    finally:
+        sampler.close()
+
+    assert sampler.total_frames == 200
+    assert sampler.expected_frames == 30
+    expected = [i for start, length in sampler.runs for i in range(start, start + length)]
+    assert [index for index, _ in frames] == expected
+
+    for index, rgb in frames:
+        assert not rgb.flags.writeable
+        assert abs(int(rgb.mean()) - index) <= 2
+
+
+def test_unknown_strategy_is_rejected(clip):
+    with pytest.raises(ValueError):
+        VideoSampler(clip, strategy="random")
+
+
+def test_coarse_to_fine_visits_every_run_once():
+    for count in range(12):
+        assert sorted(coarse_to_fine_order(count)) == list(range(count))
+
+    assert coarse_to_fine_order(9)[:5] == [0, 8, 4, 2, 6]
+
+
+def test_sampler_reads_runs_coarse_to_fine(clip):
+    sampler = VideoSampler(clip, budget=50, strategy="uniform", run_length=10, coarse_to_fine=True)
+    try:
+        indices = [index for index, _ in sampler]
+    finally:
+        sampler.close()
+
+    starts = [start for start, _ in sampler.runs]
+    assert starts == [0, 190, 95, 48, 142]
+    assert indices == [i for start in starts for i in range(start, start + 10)]
+
+
+class StopAfter(FrameStage):
+    name = "stop_after"
+    coarse_to_fine = True
+
+    def __init__(self, frames):
+        super().__init__(150)
+        self.limit = frames
+        self.indices = []
+
+    @property
+    def done(self):
+        return len(self.indices) >= self.limit
+
+    def process(self, index, frame):
+        self.indices.append(index)
+
+    def result(self):
+        return self.indices
+
+
+def test_early_exit_has_seen_the_whole_clip(clip):
+    indices = run_video_pipeline(clip, [StopAfter(30)], strategy="uniform", frame_budget=150)[0]
+
+    assert len(indices) == 30
+    assert min(indices) < 20
+    assert max(indices) > 180
@@ -0,0 +1,90 @@
+import io
+import zipfile
+
+import pytest
+from PIL import Image
+
+import app
+import model_registry
+from result_cache import ResultCache
+
+POISON = (255, 0, 0)
+
+
+class FakeMTCNN:
+    """Raises like facenet on images below its minimum face size."""
+
+    def __init__(self):
+        self.seen = []
+
+    def detect(self, images):
+        for image in images:
+            self.seen.append(image.size)
+            if min(image.size) < model_registry.MTCNN_MIN_FACE_SIZE:
+                raise RuntimeError("input image is smaller than min_face_size")
+            if image.getpixel((0, 0)) == POISON:
+                raise RuntimeError("detector failure")
+        return [None] * len(images), [None] * len(images)
+
+
+def png(size, color=(90, 120, 150)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def zipped(members, corrupt=()):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    data = bytearray(buf.getvalue())
+
+    # Flip a byte inside each named member so its CRC no longer matches.
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as archive:
+        for name in corrupt:
+            info = archive.getinfo(name)
+            offset = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+            data[offset + 10] ^= 0xFF
+    return bytes(data)
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    mtcnn = FakeMTCNN()
+    monkeypatch.setitem(model_registry._models, "mtcnn", mtcnn)
+    monkeypatch.setattr(app, "clip_ai_scores", lambda images: [0.2] * len(images))
+    monkeypatch.setattr(app, "result_cache", ResultCache(max_items=0))
+    return mtcnn
+
+
+def post(files):
+    client = app.app.test_client()
+    data = {"files": [(io.BytesIO(body), name) for name, body in files]}
+    response = client.post("/analyze/images", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    return {r["name"]: r for r in response.get_json()["results"]}
+
+
+def test_bad_entries_become_per_entry_errors(detector, monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_BATCH_MAX_FILE_MB", 0.01)
+
+    archive = zipped([("good.png", png((64, 64))), ("broken.png", png((64, 64))), ("tiny.png", png((12, 12)))], corrupt=["broken.png"])
+    truncated = zipped([("lost.png", png((64, 64)))])[:-40]
+    oversize = bytes(20 * 1024)
+
+    results = post([("photos.zip", archive), ("cut.zip", truncated), ("huge.png", oversize)])
+
+    assert "verdict" in results["good.png"]
+    assert "verdict" in results["tiny.png"]
+    assert "error" in results["broken.png"]
+    assert "error" in results["cut.zip"]
+    assert "error" in results["huge.png"]
+    assert (12, 12) not in detector.seen
+
+
+def test_detector_failure_is_isolated_to_its_image(detector):
+    results = post([("fine.png", png((64, 64))), ("poison.png", png((64, 64), POISON))])
+
+    assert "verdict" in results["fine.png"]
+    assert results["poison.png"] == {"name": "poison.png", "error": "Image analysis failed"}
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from image_io import CLIP_SHORT_SIDE, DETECT_MAX_SIDE, ORIENTATION_TAG, decode_image
+
+
+def encode(image, fmt="JPEG", **kwargs):
+    buf = io.BytesIO()
+    image.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+def noise(width, height, mode="RGB"):
+    channels = len(mode)
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, channels), dtype=np.uint8)
+    return Image.fromarray(pixels, mode)
+
+
+def test_large_jpeg_fills_the_pixel_budget():
+    budget = 4 * 1024 * 1024
+    views = decode_image(encode(noise(3000, 2000)), max_pixels=budget)
+
+    pixels = views.base.width * views.base.height
+    # draft() must not undershoot the budget and leave a 1/2-scale image.
+    assert 0.95 * budget <= pixels <= budget
+    assert abs(views.base.width / views.base.height - 1.5) < 0.01
+
+
+def test_small_image_is_left_alone():
+    views = decode_image(encode(noise(300, 200)))
+
+    assert views.base.size == (300, 200)
+    assert views.detect.size == (300, 200)
+    assert views.detect_scale == 1.0
+
+
+def test_views_are_sized_for_each_analyzer():
+    views = decode_image(encode(noise(2400, 1600)))
+
+    assert max(views.detect.size) == DETECT_MAX_SIDE
+    assert min(views.clip.size) == CLIP_SHORT_SIDE
+    assert views.detect_scale == views.base.width / views.detect.width
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = 6
+    views = decode_image(encode(noise(400, 200), exif=exif))
+
+    assert views.base.size == (200, 400)
+
+
+def test_non_rgb_is_converted():
+    views = decode_image(encode(noise(64, 32, "RGBA"), "PNG"))
+
+    assert views.base.mode == "RGB"
+    assert views.clip.mode == "RGB"
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from jobs import JobStore
+
+
+def wait_for(store, job_id, status="done"):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job and job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+def test_runs_job_and_reports_result():
+    store = JobStore(max_workers=1)
+    job = store.submit("audio", lambda x: x * 2, 21)
+
+    assert job["status"] == "queued"
+    done = wait_for(store, job["id"])
+    assert done["result"] == 42
+    assert done["finished_at"] >= done["started_at"]
+
+
+def test_errors_are_recorded():
+    def boom():
+        raise ValueError("bad input")
+
+    store = JobStore(max_workers=1)
+    job = store.submit("video", boom)
+
+    failed = wait_for(store, job["id"], "error")
+    assert failed["error"] == "bad input"
+
+
+def test_queue_cap_rejects_and_recovers():
+    release = threading.Event()
+    store = JobStore(max_workers=1, max_pending=2)
+
+    first = store.submit("video", release.wait)
+    second = store.submit("video", release.wait)
+    assert store.submit("video", release.wait) is None
+    assert store.stats()["pending"] == 2
+
+    release.set()
+    wait_for(store, first["id"])
+    wait_for(store, second["id"])
+    assert store.submit("video", lambda: None) is not None
+
+
+def test_finished_jobs_expire(monkeypatch):
+    store = JobStore(max_workers=1, ttl_seconds=60)
+    job = store.submit("audio", lambda: "ok")
+    wait_for(store, job["id"])
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert store.get(job["id"]) is None
+    assert store.stats()["jobs"] == {}
+
+
+def test_shared_dir_answers_for_other_workers(tmp_path):
+    owner = JobStore(max_workers=1, jobs_dir=str(tmp_path))
+    other = JobStore(max_workers=1, jobs_dir=str(tmp_path))
+
+    job = owner.submit("audio", lambda: {"verdict": "Real"})
+    wait_for(owner, job["id"])
+
+    seen = other.get(job["id"])
+    assert seen["status"] == "done"
+    assert seen["result"] == {"verdict": "Real"}
+    assert other.stats()["stored"] == 1
+    assert other.get("../" + job["id"]) is None
+
+
+def test_expired_record_in_shared_dir_is_ignored(tmp_path, monkeypatch):
+    owner = JobStore(max_workers=1, ttl_seconds=60, jobs_dir=str(tmp_path))
+    other = JobStore(max_workers=1, ttl_seconds=60, jobs_dir=str(tmp_path))
+
+    job = owner.submit("audio", lambda: "ok")
+    wait_for(owner, job["id"])
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert other.get(job["id"]) is None
@@ -0,0 +1,158 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import link_forensics
+from link_forensics import fetch_page
+
+
+BIG = b"a" * (2 * 1024 * 1024)
+TRIGGER = b"please verify your account today"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/big":
+            self.send_body(BIG)
+        elif self.path == "/trigger-first":
+            self.send_body(TRIGGER + BIG)
+        elif self.path == "/slow":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            try:
+                for _ in range(50):
+                    self.wfile.write(b"x" * 64)
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except OSError:
+                pass
+        elif self.path.startswith("/redirect/"):
+            hops = int(self.path.rsplit("/", 1)[1])
+            if hops == 0:
+                self.send_body(b"landed")
+            else:
+                self.send_response(302)
+                self.send_header("Location", f"/redirect/{hops - 1}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_proxy(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+
+
+def test_byte_cap_stops_reading(base_url):
+    page = fetch_page(base_url + "/big", max_bytes=64 * 1024)
+
+    assert page["truncated"]
+    assert 64 * 1024 <= page["bytes_read"] < 64 * 1024 + 2 * link_forensics.CHUNK_SIZE
+    assert page["matched"] == []
+
+
+def test_deadline_stops_slow_page(base_url):
+    started = time.monotonic()
+    page = fetch_page(base_url + "/slow", deadline=0.5)
+
+    assert page["truncated"]
+    assert time.monotonic() - started < 2.0
+    assert page["bytes_read"] < 50 * 64
+
+
+def test_redirect_hops_are_recorded(base_url):
+    page = fetch_page(base_url + "/redirect/3")
+
+    assert page["status"] == 200
+    assert page["final_url"] == base_url + "/redirect/0"
+    assert [hop["url"] for hop in page["redirects"]] == [
+        base_url + "/redirect/3",
+        base_url + "/redirect/2",
+        base_url + "/redirect/1",
+    ]
+    assert all(hop["status"] == 302 for hop in page["redirects"])
+
+
+def test_stops_at_first_match(base_url):
+    page = fetch_page(base_url + "/trigger-first", stop_on_match=True)
+
+    assert page["matched"] == ["verify your account"]
+    assert not page["truncated"]
+    assert page["bytes_read"] < len(BIG)
+
+
+def test_counts_every_match_without_stop(base_url):
+    page = fetch_page(base_url + "/trigger-first", stop_on_match=False, max_bytes=len(BIG) * 2)
+
+    assert page["match_counts"] == {"verify your account": 1}
+    assert page["bytes_read"] == len(TRIGGER) + len(BIG)
+
+
+def fake_fetch(pages, calls):
+    def fetch(url):
+        calls.append(url)
+        return dict(pages[url])
+    return fetch
+
+
+def clean_page(url):
+    return {"final_url": url, "status": 200, "redirects": [], "matched": []}
+
+
+def test_private_suffix_sites_are_separate_domains():
+    ext = link_forensics.extract_domain("https://evil-login.github.io/verify")
+
+    assert ext.suffix == "github.io"
+    assert ext.domain == "evil-login"
+
+
+def test_fetches_are_cached_per_url(monkeypatch):
+    clean = "https://docs.github.io/"
+    phish = "https://evil-login.github.io/verify"
+    pages = {
+        clean: clean_page(clean),
+        phish: dict(clean_page(phish), matched=["verify your account"]),
+    }
+    calls = []
+    monkeypatch.setattr(link_forensics, "fetch_cache", link_forensics.TTLCache(16, 60))
+    monkeypatch.setattr(link_forensics, "fetch_page", fake_fetch(pages, calls))
+
+    first, cached = link_forensics.cached_fetch(clean)
+    assert not cached
+
+    page, cached = link_forensics.cached_fetch(phish)
+    assert not cached
+    assert page["matched"] == ["verify your account"]
+
+    again, cached = link_forensics.cached_fetch(clean)
+    assert cached
+    assert again == first
+    assert calls == [clean, phish]
@@ -0,0 +1,62 @@
+import io
+import multiprocessing
+import time
+
+import pytest
+
+import app
+import metrics
+
+
+def worker_metrics():
+    metrics.inc("requests_total", endpoint="/x", status=200)
+    metrics.observe("request_seconds", 0.02, endpoint="/x")
+    metrics.set_gauge("lane_active", 3, lane="image")
+    metrics.flush()
+
+
+def test_render_adds_up_every_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+
+    metrics.inc("requests_total", endpoint="/x", status=200)
+    metrics.observe("request_seconds", 0.02, endpoint="/x")
+    metrics.set_gauge("lane_active", 1, lane="image")
+
+    for _ in range(2):
+        child = multiprocessing.get_context("fork").Process(target=worker_metrics)
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+
+    text = metrics.render()
+
+    # Exited workers' counters and histograms still count, their gauges do not.
+    assert 'deepfake_requests_total{endpoint="/x",status="200"} 3' in text
+    assert 'deepfake_request_seconds_count{endpoint="/x"} 3' in text
+    assert 'deepfake_request_seconds_bucket{endpoint="/x",le="0.025"} 3' in text
+    assert 'deepfake_lane_active{lane="image"} 1' in text
+
+
+def test_streamed_request_is_timed_to_the_end(monkeypatch):
+    def slow_uploads(uploads, cascade=False):
+        list(uploads)
+        time.sleep(0.2)
+        yield 0, "a.png", {"error": "Not a readable image or too large"}
+
+    monkeypatch.setattr(app, "analyze_image_uploads", slow_uploads)
+    key = ("request_seconds", (("endpoint", "/analyze/images"),))
+    before = metrics._histograms[key].sum if key in metrics._histograms else 0.0
+
+    client = app.app.test_client()
+    response = client.post(
+        "/analyze/images?stream=1",
+        data={"files": [(io.BytesIO(b"x"), "a.png")]},
+        content_type="multipart/form-data"
+    )
+    assert response.get_data()
+    response.close()
+
+    assert metrics._histograms[key].sum - before == pytest.approx(0.2, abs=0.15)
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+import phrase_matcher
+from phrase_matcher import PhraseMatcher
+
+
+PHRASES = ["ab", "aba", "bab", "a", "verify your account"]
+
+
+def naive_counts(text, phrases):
+    counts = {}
+    for phrase in phrases:
+        n = sum(1 for i in range(len(text)) if text.startswith(phrase, i))
+        if n:
+            counts[phrase] = n
+    return counts
+
+
+@pytest.fixture(params=["ahocorasick", "find", "python"])
+def backend(request, monkeypatch):
+    if request.param == "ahocorasick":
+        if phrase_matcher.ahocorasick is None:
+            pytest.skip("pyahocorasick is not installed")
+    else:
+        monkeypatch.setattr(phrase_matcher, "ahocorasick", None)
+        monkeypatch.setattr(phrase_matcher, "FIND_MAX_PHRASES", 64 if request.param == "find" else 0)
+    return request.param
+
+
+def feed_in_chunks(scanner, text, rng):
+    i = 0
+    while i < len(text):
+        j = i + rng.randint(1, 7)
+        scanner.feed(text[i:j])
+        i = j
+
+
+def test_backend_is_selected(backend):
+    assert PhraseMatcher(PHRASES).backend == backend
+
+
+def test_phrase_split_across_chunks(backend):
+    scanner = PhraseMatcher(["verify your account", "suspended"]).scanner()
+
+    assert scanner.feed("please ver") == 0
+    assert scanner.feed("ify your acc") == 0
+    assert scanner.feed("ount now") == 1
+    assert scanner.counts == {"verify your account": 1}
+
+
+def test_case_insensitive(backend):
+    assert PhraseMatcher(["Verify Your Account"]).count("VERIFY your ACCOUNT") == {"verify your account": 1}
+
+
+def test_chunked_counts_match_naive_overlapping_counts(backend):
+    matcher = PhraseMatcher(PHRASES)
+    rng = random.Random(0)
+
+    for _ in range(300):
+        text = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 60)))
+        scanner = matcher.scanner()
+        feed_in_chunks(scanner, text, rng)
+        assert scanner.counts == naive_counts(text, PHRASES), text
+
+
+def test_empty_phrase_list(backend):
+    matcher = PhraseMatcher([])
+    assert matcher.scanner().feed("anything") == 0
+    assert matcher.count("anything") == {}
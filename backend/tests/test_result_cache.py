@@ -0,0 +1,139 @@
+import os
+import time
+
+from result_cache import ResultCache, TTLCache, content_key
+
+
+def test_content_key_depends_on_kind_version_and_payload():
+    key = content_key("image", "v1", b"data")
+
+    assert key == content_key("image", "v1", b"data")
+    assert key != content_key("image", "v2", b"data")
+    assert key != content_key("video", "v1", b"data")
+    assert key != content_key("image", "v1", b"other")
+    assert content_key("link", "v1", "http://a") == content_key("link", "v1", b"http://a")
+
+
+def test_memory_tier_is_lru():
+    cache = ResultCache(max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ResultCache(max_items=0, disk_dir=str(tmp_path)).put("k", {"verdict": "Real"})
+
+    cache = ResultCache(max_items=4, disk_dir=str(tmp_path))
+    assert cache.get("k") == {"verdict": "Real"}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_workers_see_each_others_entries(tmp_path):
+    first = ResultCache(max_items=4, disk_dir=str(tmp_path))
+    second = ResultCache(max_items=4, disk_dir=str(tmp_path))
+
+    first.put("k", [1, 2, 3])
+    assert second.get("k") == [1, 2, 3]
+
+
+def test_disk_budget_is_shared_by_the_directory(tmp_path):
+    value = "x" * 1000
+    size = len(f'"{value}"')
+    workers = [
+        ResultCache(max_items=0, disk_dir=str(tmp_path), disk_max_bytes=5 * size, rescan_seconds=0)
+        for _ in range(3)
+    ]
+
+    for i in range(12):
+        workers[i % 3].put(f"key{i}", value)
+        time.sleep(0.01)
+
+    files = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".json")]
+    assert len(files) <= 5
+    # The newest entries are the ones kept.
+    assert workers[0].get("key11") == value
+    assert workers[1].get("key0") is None
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = ResultCache(max_items=0, disk_dir=str(tmp_path))
+    cache.put("k", {"a": 1})
+
+    with open(cache._path("k"), "w") as f:
+        f.write("{not json")
+
+    assert cache.get("k") is None
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    cache = TTLCache(max_items=4, ttl_seconds=10)
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_ttl_cache_is_lru_bounded():
+    cache = TTLCache(max_items=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["items"] == 2
+
+
+def test_zero_sized_caches_store_nothing(tmp_path):
+    cache = TTLCache(max_items=0)
+    cache.put("k", "v")
+    assert cache.get("k") is None
+
+    cache = ResultCache(max_items=0)
+    cache.put("k", "v")
+    assert cache.get("k") is None
+
+
+def test_link_verdicts_are_not_result_cached(monkeypatch):
+    import app
+    import link_forensics
+
+    url = "https://example.org/"
+    responses = [OSError("connection reset"), {
+        "final_url": url, "status": 200, "redirects": [], "matched": []
+    }]
+
+    def fetch(u):
+        outcome = responses.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(link_forensics, "fetch_cache", link_forensics.TTLCache(16, 60))
+    monkeypatch.setattr(link_forensics, "fetch_page", fetch)
+    client = app.app.test_client()
+
+    failed = client.post("/analyze/link", json={"url": url}).get_json()
+    retried = client.post("/analyze/link", json={"url": url}).get_json()
+
+    assert failed["fetch"] is None
+    assert "Unreachable or Unstable Link" in [r["title"] for r in failed["reasons"]]
+    assert retried["fetch"]["status"] == 200
+    assert "Unreachable or Unstable Link" not in [r["title"] for r in retried["reasons"]]
+    assert responses == []
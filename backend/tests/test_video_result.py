@@ -0,0 +1,47 @@
+import app
+
+
+class FakeStage:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeLandmarks(FakeStage):
+    def __init__(self, converge=False):
+        super().__init__("landmarks")
+        self.stats = {"jitter": 0.1}
+        self.frames_seen = 40
+        self.converged = converge
+
+
+def run(monkeypatch, signals, timesformer_score):
+    def pipeline(path, stages):
+        results = {"landmarks": ("Real", 80), "face_embedding": ("Fake", 60), "timesformer": timesformer_score}
+        return [results[stage.name] for stage in stages]
+
+    monkeypatch.setattr(app, "LandmarkForensicsStage", FakeLandmarks)
+    monkeypatch.setattr(app, "FaceEmbeddingStage", lambda: FakeStage("face_embedding"))
+    monkeypatch.setattr(app, "TimesformerStage", lambda: FakeStage("timesformer"))
+    monkeypatch.setattr(app, "run_video_pipeline", pipeline)
+    monkeypatch.setattr(app.result_cache, "get", lambda key: None)
+    monkeypatch.setattr(app.result_cache, "put", lambda key, value: None)
+
+    return app.video_result(b"clip", signals=signals)
+
+
+def test_default_runs_landmarks_only(monkeypatch):
+    result = run(monkeypatch, False, 0.9)
+
+    assert result["stages"] == ["landmarks"]
+    assert result["signals"]["appearance"] is None
+    assert result["signals"]["timesformer"] is None
+
+
+def test_timesformer_is_reported_without_moving_the_verdict(monkeypatch):
+    low = run(monkeypatch, True, 0.05)
+    high = run(monkeypatch, True, 0.95)
+
+    assert high["stages"] == ["landmarks", "face_embedding", "timesformer"]
+    assert high["signals"]["timesformer"] == {"score": 0.95}
+    assert low["signals"]["timesformer"] == {"score": 0.05}
+    assert (low["verdict"], low["confidence"]) == (high["verdict"], high["confidence"]) == ("Real", 80)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from voice_activity import FRAME_MS, trim_silence
+
+SR = 16000
+
+
+def tone(seconds, amplitude):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_silence_around_speech_is_removed():
+    rng = np.random.default_rng(0)
+    y = np.concatenate([
+        rng.normal(0, 1e-4, 3 * SR).astype(np.float32),
+        tone(2, 0.5),
+        rng.normal(0, 1e-4, 3 * SR).astype(np.float32),
+    ])
+
+    speech, info = trim_silence(y, SR)
+
+    assert info["duration_s"] == 8.0
+    # Two seconds of tone plus the hangover kept on each side.
+    assert 2.0 <= info["speech_s"] <= 2.0 + 2 * 7 * FRAME_MS / 1000
+    assert len(speech) == round(info["speech_s"] * SR)
+    assert np.abs(speech).max() > 0.4
+
+
+def test_flat_clip_is_kept_whole():
+    y = tone(3, 0.3)
+    speech, info = trim_silence(y, SR)
+
+    assert np.array_equal(speech, y)
+    assert info["speech_ratio"] == 1.0
+
+
+def test_too_little_speech_keeps_the_clip():
+    rng = np.random.default_rng(1)
+    y = np.concatenate([
+        rng.normal(0, 1e-4, int(0.3 * SR)).astype(np.float32),
+        tone(0.06, 0.5),
+        rng.normal(0, 1e-4, int(0.3 * SR)).astype(np.float32),
+    ])
+
+    speech, info = trim_silence(y, SR)
+
+    assert speech is y
+    assert info["speech_s"] == info["duration_s"]
+
+
+def test_empty_clip():
+    speech, info = trim_silence(np.zeros(0, dtype=np.float32), SR)
+
+    assert len(speech) == 0
+    assert info["speech_ratio"] == 0.0
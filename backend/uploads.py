@@ -0,0 +1,29 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import metrics
+
+
+# Point this at a tmpfs mount (e.g. /dev/shm) to keep uploads off disk.
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR") or None
+
+
+@contextmanager
+def upload_tempfile(data, suffix=""):
+    """
+    Writes uploaded bytes to a uniquely named temp file for decoders that
+    only accept a path, and removes it afterwards. Concurrent requests
+    never share a file.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_TMP_DIR)
+
+    try:
+        with metrics.timed("upload_save"), os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
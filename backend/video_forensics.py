@@ -1,73 +1,164 @@
-import cv2
+import os
 import numpy as np
-import mediapipe as mp
+from model_registry import get_model
+from video_pipeline import FrameStage, run_video_pipeline
+from frame_sampling import VIDEO_FRAME_BUDGET
 
-mp_face_mesh = mp.solutions.face_mesh.FaceMesh(
-    static_image_mode=False,
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+NUM_LANDMARKS = 478
 
 LEFT_EYE = [33, 160, 158, 133, 153, 144]
 RIGHT_EYE = [362, 385, 387, 263, 373, 380]
 
-def eye_aspect_ratio(landmarks, eye):
-    p = [landmarks[i] for i in eye]
-    vertical = np.linalg.norm(p[1] - p[5]) + np.linalg.norm(p[2] - p[4])
-    horizontal = 2.0 * np.linalg.norm(p[0] - p[3])
-    return vertical / horizontal if horizontal != 0 else 0
-
-def analyze_video_forensics(video_path, max_frames=150):
-    cap = cv2.VideoCapture(video_path)
+# Eye aspect ratio below which an eye counts as closed.
+BLINK_EAR = 0.21
 
-    landmark_movements = []
-    blink_ratios = []
-    prev_landmarks = None
-    frame_count = 0
+# Forensic scores above these are "Possibly" and "Likely AI-Generated".
+FORENSIC_THRESHOLDS = (0.6, 1.2)
 
-    while cap.isOpened() and frame_count < max_frames:
-        ret, frame = cap.read()
-        if not ret:
-            break
+# Early exit: from CONVERGE_MIN_FRAMES face frames on, the forensic score
+# is recomputed every CONVERGE_EVERY. Once it has moved by less than
+# CONVERGE_TOLERANCE (relative) over two checks in a row, and sits more
+# than CONVERGE_MARGIN (relative) from every threshold, more frames would
+# not change the verdict.
+CONVERGE_MIN_FRAMES = int(os.environ.get("CASCADE_MIN_FACE_FRAMES", 45))
+CONVERGE_EVERY = 15
+CONVERGE_TOLERANCE = float(os.environ.get("CASCADE_TOLERANCE", 0.05))
+CONVERGE_MARGIN = 0.15
 
-        frame_count += 1
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = mp_face_mesh.process(rgb)
+def eye_aspect_ratio(landmarks, eye):
+    # Works on one frame (478, 2) or a stack of frames (T, 478, 2).
+    p = landmarks[..., eye, :]
+    vertical = (
+        np.linalg.norm(p[..., 1, :] - p[..., 5, :], axis=-1)
+        + np.linalg.norm(p[..., 2, :] - p[..., 4, :], axis=-1)
+    )
+    horizontal = 2.0 * np.linalg.norm(p[..., 0, :] - p[..., 3, :], axis=-1)
+    return np.divide(
+        vertical,
+        horizontal,
+        out=np.zeros_like(vertical),
+        where=horizontal != 0
+    )
+
+
+def forensic_score(stats):
+    return (stats["jitter"] * 8) + (stats["blink_variance"] * 20)
+
+
+class LandmarkForensicsStage(FrameStage):
+    name = "facemesh"
+
+    def __init__(self, max_frames=VIDEO_FRAME_BUDGET, converge=False):
+        super().__init__(max_frames)
+        self.converge = converge
+        # An early exit should still have seen the whole clip.
+        self.coarse_to_fine = converge
+        self.converged = False
+        self.next_check = CONVERGE_MIN_FRAMES
+        self.last_score = None
+        self.stable_checks = 0
+        self.face_mesh = get_model("face_mesh")()
+
+        # One row per frame with a face; run ids mark jumps between the
+        # sampled runs so movement is never measured across a gap.
+        self.landmarks = np.zeros((max_frames, NUM_LANDMARKS, 2))
+        self.run_ids = np.zeros(max_frames, dtype=np.int32)
+        self.count = 0
+
+        self.run_id = 0
+        self.prev_index = None
+        self.stats = {}
+
+    @property
+    def done(self):
+        return self.converged or super().done
+
+    def process(self, index, frame):
+        if self.prev_index is not None and index != self.prev_index + 1:
+            self.run_id += 1
+        self.prev_index = index
+
+        result = self.face_mesh.process(frame)
 
         if not result.multi_face_landmarks:
-            continue
+            return
 
-        landmarks = np.array([
-            [lm.x, lm.y]
+        self.landmarks[self.count] = [
+            (lm.x, lm.y)
             for lm in result.multi_face_landmarks[0].landmark
-        ])
-
-        if prev_landmarks is not None:
-            movement = np.mean(np.linalg.norm(landmarks - prev_landmarks, axis=1))
-            landmark_movements.append(movement)
-
-        left_ear = eye_aspect_ratio(landmarks, LEFT_EYE)
-        right_ear = eye_aspect_ratio(landmarks, RIGHT_EYE)
-        blink_ratios.append((left_ear + right_ear) / 2)
-
-        prev_landmarks = landmarks
-
-    cap.release()
-
-    if len(landmark_movements) < 10:
-        return "Possibly AI-Generated", 50
-
-    jitter_score = float(np.mean(landmark_movements))
-    blink_variance = float(np.var(blink_ratios))
-
-    forensic_score = (jitter_score * 8) + (blink_variance * 20)
-
-    if forensic_score > 1.2:
-        return "Likely AI-Generated", min(95, int(forensic_score * 70))
-    elif forensic_score > 0.6:
-        return "Possibly AI-Generated", min(80, int(forensic_score * 60))
-    else:
-        return "Real", max(55, 100 - int(forensic_score * 80))
-  
\ No newline at end of file
+        ]
+        self.run_ids[self.count] = self.run_id
+        self.count += 1
+
+        if self.converge and self.count >= self.next_check:
+            self.check_convergence()
+
+    def check_convergence(self):
+        self.next_check = self.count + CONVERGE_EVERY
+
+        stats = self.temporal_statistics()
+        if len(stats["movements"]) < 10:
+            return
+
+        score = forensic_score(stats)
+        previous, self.last_score = self.last_score, score
+        if previous is None:
+            return
+
+        if abs(score - previous) <= CONVERGE_TOLERANCE * max(score, previous):
+            self.stable_checks += 1
+        else:
+            self.stable_checks = 0
+
+        clear = all(abs(score - t) > CONVERGE_MARGIN * t for t in FORENSIC_THRESHOLDS)
+        self.converged = self.stable_checks >= 2 and clear
+
+    def close(self):
+        self.face_mesh.close()
+
+    def temporal_statistics(self):
+        landmarks = self.landmarks[:self.count]
+        run_ids = self.run_ids[:self.count]
+        same_run = run_ids[1:] == run_ids[:-1]
+
+        movements = np.linalg.norm(landmarks[1:] - landmarks[:-1], axis=2).mean(axis=1)
+        movements = movements[same_run]
+
+        ear = (eye_aspect_ratio(landmarks, LEFT_EYE) + eye_aspect_ratio(landmarks, RIGHT_EYE)) / 2
+        closed = ear < BLINK_EAR
+        blinks = int(np.count_nonzero(closed[1:] & ~closed[:-1] & same_run))
+
+        accel = np.abs(np.diff(movements)) if len(movements) > 1 else np.zeros(0)
+
+        return {
+            "face_frames": int(self.count),
+            "movements": movements,
+            "jitter": float(movements.mean()) if len(movements) else 0.0,
+            "jitter_std": float(movements.std()) if len(movements) else 0.0,
+            "jitter_accel": float(accel.mean()) if len(accel) else 0.0,
+            "blink_variance": float(np.var(ear)) if len(ear) else 0.0,
+            "blinks": blinks,
+        }
+
+    def result(self):
+        stats = self.temporal_statistics()
+        movements = stats.pop("movements")
+        self.stats = stats
+
+        if len(movements) < 10:
+            return "Possibly AI-Generated", 50
+
+        score = forensic_score(stats)
+        possibly, likely = FORENSIC_THRESHOLDS
+
+        if score > likely:
+            return "Likely AI-Generated", min(95, int(score * 70))
+        elif score > possibly:
+            return "Possibly AI-Generated", min(80, int(score * 60))
+        else:
+            return "Real", max(55, 100 - int(score * 80))
+
+
+def analyze_video_forensics(video_path, max_frames=VIDEO_FRAME_BUDGET, strategy=None):
+    stage = LandmarkForensicsStage(max_frames)
+    return run_video_pipeline(video_path, [stage], strategy=strategy)[0]
@@ -0,0 +1,119 @@
+import time
+
+from frame_sampling import VideoSampler
+import metrics
+
+
+class FrameStage:
+    """
+    One consumer of the shared decode loop.
+
+    Subclasses implement `process(index, frame)` and `result()`. Frames are
+    RGB uint8 arrays marked read-only, since every stage sees the same
+    buffer. A `spread` stage takes `max_frames` frames evenly from
+    everything the sampler delivers instead of the first `max_frames`.
+    A `coarse_to_fine` stage may finish early and wants the runs spread
+    over the clip first (see VideoSampler).
+    """
+
+    spread = False
+    coarse_to_fine = False
+
+    # Stage label in metrics.
+    name = "frame_stage"
+
+    def __init__(self, max_frames):
+        self.max_frames = max_frames
+        self.frames_seen = 0
+        self.frames_offered = 0
+        self.stride = 1
+
+    def begin(self, expected_frames):
+        if self.spread and expected_frames:
+            self.stride = max(1, expected_frames // self.max_frames)
+
+    @property
+    def done(self):
+        return self.frames_seen >= self.max_frames
+
+    def feed(self, index, frame):
+        offered = self.frames_offered
+        self.frames_offered += 1
+        if offered % self.stride:
+            return
+
+        self.frames_seen += 1
+        self.process(index, frame)
+
+    def process(self, index, frame):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def run_video_pipeline(video_path, stages, strategy=None, frame_budget=None):
+    """
+    Decodes the sampled frames once and fans each one out to every stage
+    that still wants frames. Returns the stage results in order.
+
+    When every stage is `spread`, frames are sampled one at a time rather
+    than in runs, so only the frames actually used get decoded.
+    """
+    contiguous = [stage.max_frames for stage in stages if not stage.spread]
+    budget = frame_budget or max(contiguous or [stage.max_frames for stage in stages])
+    run_length = None if contiguous else 1
+
+    # Time is summed per stage over the whole clip and recorded once, so
+    # the histograms describe videos rather than single frames.
+    clock = time.perf_counter
+    spent = dict.fromkeys([stage.name for stage in stages] + ["video_decode"], 0.0)
+    frames = 0
+
+    start = clock()
+    sampler = VideoSampler(
+        video_path,
+        budget,
+        strategy=strategy,
+        run_length=run_length,
+        coarse_to_fine=any(stage.coarse_to_fine for stage in stages)
+    )
+
+    try:
+        for stage in stages:
+            stage.begin(sampler.expected_frames)
+
+        for index, frame in sampler:
+            now = clock()
+            spent["video_decode"] += now - start
+            frames += 1
+
+            active = [stage for stage in stages if not stage.done]
+            if not active:
+                break
+
+            for stage in active:
+                stage.feed(index, frame)
+                start, now = now, clock()
+                spent[stage.name] += now - start
+
+            start = now
+
+        results = []
+        for stage in stages:
+            start = clock()
+            results.append(stage.result())
+            spent[stage.name] += clock() - start
+
+        return results
+    finally:
+        sampler.close()
+        for stage in stages:
+            stage.close()
+
+        metrics.inc("frames_processed_total", frames)
+        for name, seconds in spent.items():
+            metrics.observe_stage(name, seconds)
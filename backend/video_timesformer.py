@@ -1,45 +1,42 @@
-import torch
-import cv2
 import numpy as np
-from transformers import TimesformerForVideoClassification, AutoImageProcessor
+from model_registry import get_model, get_device
+from video_pipeline import FrameStage, run_video_pipeline
 
 
-model = TimesformerForVideoClassification.from_pretrained(
-    "facebook/timesformer-base-finetuned-k400"
-)
-processor = AutoImageProcessor.from_pretrained(
-    "facebook/timesformer-base-finetuned-k400"
-)
+class TimesformerStage(FrameStage):
+    # Sample the clip across its whole length, not just its opening.
+    spread = True
+    name = "timesformer"
 
-model.eval()
+    def __init__(self, num_frames=8):
+        super().__init__(num_frames)
+        self.frames = []
 
-def timesformer_ai_score(video_path):
-    cap = cv2.VideoCapture(video_path)
-    frames = []
+    def process(self, index, frame):
+        self.frames.append(frame)
+
+    def result(self):
+        import torch
 
-    
-    while len(frames) < 8:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frames.append(frame)
+        if len(self.frames) < 4:
+            return 0.5  
 
-    cap.release()
+        model, processor = get_model("timesformer")
 
-    if len(frames) < 4:
-        return 0.5  
+        inputs = processor(
+            self.frames,
+            return_tensors="pt"
+        ).to(get_device())
 
-    inputs = processor(
-        frames,
-        return_tensors="pt"
-    )
+        with torch.no_grad():
+            outputs = model(**inputs)
+            probs = torch.softmax(outputs.logits, dim=1)
 
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.softmax(outputs.logits, dim=1)
+        
+        fake_prob = probs[0][1].item()
 
-    
-    fake_prob = probs[0][1].item()
+        return float(fake_prob)
 
-    return float(fake_prob)
+
+def timesformer_ai_score(video_path):
+    return run_video_pipeline(video_path, [TimesformerStage()])[0]
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+FRAME_MS = 30
+
+# A frame is speech when its energy sits this far above the noise floor
+# (the quietest decile of frames).
+SPEECH_MARGIN_DB = 6.0
+
+# Clips whose loud and quiet frames differ by less than this have no
+# clear silence to remove and are kept whole.
+MIN_DYNAMIC_RANGE_DB = 10.0
+
+# Frames kept on each side of detected speech so word onsets and
+# trailing consonants survive.
+HANGOVER_FRAMES = 6
+
+MIN_SPEECH_SECONDS = 0.5
+
+
+def frame_energy_db(y, frame):
+    n = len(y) // frame
+    frames = y[:n * frame].reshape(n, frame).astype(np.float32)
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def speech_mask(y, sr=16000, frame_ms=FRAME_MS):
+    """
+    Marks each `frame_ms` frame as speech (True) or not, from frame
+    energy relative to the clip's own noise floor.
+    """
+    frame = max(1, int(sr * frame_ms / 1000))
+    energy = frame_energy_db(y, frame)
+
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool), frame
+
+    floor = np.percentile(energy, 10)
+    peak = np.percentile(energy, 95)
+
+    if peak - floor < MIN_DYNAMIC_RANGE_DB:
+        return np.ones(len(energy), dtype=bool), frame
+
+    mask = energy > floor + SPEECH_MARGIN_DB
+
+    if HANGOVER_FRAMES:
+        width = 2 * HANGOVER_FRAMES + 1
+        mask = np.convolve(mask.astype(np.int32), np.ones(width, dtype=np.int32), mode="same") > 0
+
+    return mask, frame
+
+
+def trim_silence(y, sr=16000):
+    """
+    Drops non-speech frames. Returns the kept audio and a summary of how
+    much was kept. Falls back to the untouched clip when too little
+    speech is found to analyse.
+    """
+    mask, frame = speech_mask(y, sr)
+
+    keep = np.repeat(mask, frame)
+    tail = len(y) - len(keep)
+    if tail:
+        keep = np.concatenate([keep, np.full(tail, bool(mask[-1]) if len(mask) else True)])
+
+    speech = y[keep]
+    if len(speech) < MIN_SPEECH_SECONDS * sr:
+        speech = y
+
+    duration = len(y) / sr
+    kept = len(speech) / sr
+
+    return speech, {
+        "duration_s": round(duration, 2),
+        "speech_s": round(kept, 2),
+        "speech_ratio": round(kept / duration, 3) if duration else 0.0,
+    }